@@ -1,13 +1,39 @@
 import os
+import atexit
 import io
+import base64
+import bisect
 import csv
+import gzip
+import json
+import mimetypes
+import re
 import sqlite3
 import hashlib
 import secrets
+import tempfile
 import random
-from datetime import datetime, date
+import queue
+import threading
+import time
+import zipfile
+import click
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
 from functools import wraps
-from flask import Flask, request, jsonify, session, send_from_directory, Response
+from urllib.request import pathname2url
+from xml.sax.saxutils import escape as xml_escape
+try:
+    import brotli  # 선택: 설치되어 있으면 정적 파일을 brotli로도 미리 압축
+except ImportError:
+    brotli = None
+try:
+    import fcntl  # 백업 스케줄러 잠금 (Windows에는 없음: 개발용 단일 프로세스라 잠금 없이 실행)
+except ImportError:
+    fcntl = None
+from flask import (Flask, request, jsonify, session, send_file, send_from_directory, Response, g, has_app_context,
+                   stream_with_context)
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
 
@@ -29,21 +55,454 @@ app.secret_key = os.environ.get('SECRET_KEY') or get_or_create_secret_key()
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 
-DB_PATH = os.path.join(os.path.dirname(__file__), 'data', 'questions.db')
-
-
-def get_db():
-    conn = sqlite3.connect(DB_PATH)
+DB_PATH = os.environ.get('DB_PATH') or os.path.join(os.path.dirname(__file__), 'data', 'questions.db')
+
+# 여러 학교 모드: 'host'면 호스트 이름의 첫 부분(hanbit.example.kr → hanbit), 'path'면 /s/<학교>/ 경로로 학교를 정하고
+# TENANT_DIR/<학교>.db를 씀 (flask --app app tenant-create <학교>로 만든 학교만 접속 가능). 비워두면 DB_PATH 하나만 씀
+TENANT_MODE = os.environ.get('TENANT_MODE', '')
+TENANT_DIR = os.environ.get('TENANT_DIR') or os.path.join(os.path.dirname(__file__), 'data', 'tenants')
+TENANT_MAX_OPEN = int(os.environ.get('TENANT_MAX_OPEN', '32'))  # 워커 프로세스당 동시에 열어 둘 학교 DB 수
+TENANT_IDLE_SECONDS = int(os.environ.get('TENANT_IDLE_SECONDS', '600'))  # 이 시간 동안 요청이 없으면 닫음
+TENANT_PATH_PREFIX = 's'
+TENANT_NAME = re.compile(r'^[a-z0-9][a-z0-9-]{0,39}$')
+
+
+# 연결 풀 설정: 워커 프로세스당 최대 연결 수와 연결을 기다리는 최대 시간(초)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+
+# 쓰기 잠금 설정: SQLite가 잠금을 기다리는 시간(초)과 그 뒤 다시 시도하는 횟수
+DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', '5'))
+DB_WRITE_RETRIES = int(os.environ.get('DB_WRITE_RETRIES', '2'))
+
+# WAL 체크포인트: CHECKPOINT_INTERVAL초마다 백업 스케줄러가 PASSIVE 체크포인트를 하고, 요청 처리 중의
+# 자동 체크포인트(커밋한 요청이 WAL을 DB 파일로 옮기느라 느려짐)는 WAL이 WAL_AUTOCHECKPOINT 페이지를 넘을 때만
+CHECKPOINT_INTERVAL = int(os.environ.get('CHECKPOINT_INTERVAL', '60'))  # 0이면 SQLite 기본 자동 체크포인트만
+WAL_AUTOCHECKPOINT = 10000
+
+
+# 성능 지표: 요청/쿼리 시간을 워커 프로세스 메모리에 모아 /api/admin/metrics로 노출
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # 설정하면 Prometheus가 Bearer 토큰으로 수집 가능
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '0'))  # 0이면 느린 쿼리 로그 끔
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+LOCK_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        prefix = ''.join(f'{k}="{v}",' for k, v in labels)
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}'
+        label_text = '{' + prefix.rstrip(',') + '}' if prefix else ''
+        yield f'{name}_sum{label_text} {self.sum:.6f}'
+        yield f'{name}_count{label_text} {cumulative}'
+
+
+class Metrics:
+    """엔드포인트별 응답 시간, 쿼리 수/시간 집계 (값은 워커 프로세스별)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.request_seconds = {}    # (endpoint, method) -> Histogram
+        self.request_queries = {}    # endpoint -> Histogram
+        self.responses = {}          # (endpoint, method, status) -> 건수
+        self.query_seconds = Histogram(QUERY_BUCKETS)
+        self.slow_queries = 0
+        self.lock_wait_seconds = Histogram(LOCK_WAIT_BUCKETS)
+        self.lock_retries = 0
+        self.lock_failures = 0
+        self.started = time.time()
+
+    def observe_request(self, endpoint, method, status, seconds):
+        with self._lock:
+            key = (endpoint, method)
+            if key not in self.request_seconds:
+                self.request_seconds[key] = Histogram(REQUEST_BUCKETS)
+            self.request_seconds[key].observe(seconds)
+            status_key = (endpoint, method, status)
+            self.responses[status_key] = self.responses.get(status_key, 0) + 1
+
+    def observe_request_queries(self, endpoint, count):
+        with self._lock:
+            if endpoint not in self.request_queries:
+                self.request_queries[endpoint] = Histogram(QUERY_COUNT_BUCKETS)
+            self.request_queries[endpoint].observe(count)
+
+    def observe_query(self, seconds, slow=False):
+        with self._lock:
+            self.query_seconds.observe(seconds)
+            if slow:
+                self.slow_queries += 1
+
+    def observe_lock_wait(self, seconds):
+        with self._lock:
+            self.lock_wait_seconds.observe(seconds)
+
+    def count_lock(self, key):
+        with self._lock:
+            setattr(self, key, getattr(self, key) + 1)
+
+    def render(self, pool_stats):
+        """Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# HELP daily_question_http_request_duration_seconds 요청 처리 시간 (스트리밍 응답은 첫 응답까지)',
+                '# TYPE daily_question_http_request_duration_seconds histogram',
+            ]
+            for (endpoint, method), hist in sorted(self.request_seconds.items()):
+                lines.extend(hist.lines('daily_question_http_request_duration_seconds',
+                                        (('endpoint', endpoint), ('method', method))))
+            lines += [
+                '# HELP daily_question_http_responses_total 상태 코드별 응답 수',
+                '# TYPE daily_question_http_responses_total counter',
+            ]
+            for (endpoint, method, status), count in sorted(self.responses.items()):
+                lines.append(f'daily_question_http_responses_total'
+                             f'{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+            lines += [
+                '# HELP daily_question_db_queries_per_request 요청 하나가 실행한 SQL 문 수',
+                '# TYPE daily_question_db_queries_per_request histogram',
+            ]
+            for endpoint, hist in sorted(self.request_queries.items()):
+                lines.extend(hist.lines('daily_question_db_queries_per_request', (('endpoint', endpoint),)))
+            lines += [
+                '# HELP daily_question_db_query_duration_seconds SQL 문 실행 시간',
+                '# TYPE daily_question_db_query_duration_seconds histogram',
+                *self.query_seconds.lines('daily_question_db_query_duration_seconds', ()),
+                '# HELP daily_question_db_slow_queries_total SLOW_QUERY_MS를 넘긴 SQL 문 수',
+                '# TYPE daily_question_db_slow_queries_total counter',
+                f'daily_question_db_slow_queries_total {self.slow_queries}',
+                '# HELP daily_question_db_lock_wait_seconds 쓰기 잠금(BEGIN IMMEDIATE)을 얻기까지 기다린 시간',
+                '# TYPE daily_question_db_lock_wait_seconds histogram',
+                *self.lock_wait_seconds.lines('daily_question_db_lock_wait_seconds', ()),
+                '# HELP daily_question_db_lock_retries_total busy_timeout을 넘겨 다시 시도한 횟수',
+                '# TYPE daily_question_db_lock_retries_total counter',
+                f'daily_question_db_lock_retries_total {self.lock_retries}',
+                '# HELP daily_question_db_lock_failures_total 재시도 후에도 쓰기 잠금을 얻지 못해 503을 돌려준 횟수',
+                '# TYPE daily_question_db_lock_failures_total counter',
+                f'daily_question_db_lock_failures_total {self.lock_failures}',
+            ]
+        lines += ['# HELP daily_question_process_start_time_seconds 워커 시작 시각',
+                  '# TYPE daily_question_process_start_time_seconds gauge',
+                  f'daily_question_process_start_time_seconds {self.started:.0f}']
+        for key, value in sorted(pool_stats.items()):
+            if key in ('size', 'open', 'idle', 'in_use'):
+                name, kind = f'daily_question_db_pool_{key}', 'gauge'
+            else:
+                name, kind = f'daily_question_db_pool_{key}_total', 'counter'
+            lines += [f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+explain_cache = {}  # 느린 쿼리 SQL -> 실행 계획 (같은 쿼리를 매번 EXPLAIN하지 않도록)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """execute/executemany마다 실행 시간을 재고, 요청 단위 쿼리 수를 셈
+
+    SELECT는 첫 행을 가져올 때까지만 측정된다 (정렬/집계는 대부분 이 안에서 끝남).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query_count = 0
+
+    def take_query_count(self):
+        count, self.query_count = self.query_count, 0
+        return count
+
+    def _observe(self, sql, parameters, seconds):
+        self.query_count += 1
+        slow = SLOW_QUERY_MS > 0 and seconds * 1000 >= SLOW_QUERY_MS
+        metrics.observe_query(seconds, slow)
+        if slow:
+            app.logger.warning('느린 쿼리 %.1fms: %s\n%s', seconds * 1000, ' '.join(sql.split()),
+                               self._explain(sql, parameters))
+
+    def _explain(self, sql, parameters):
+        if sql in explain_cache:
+            return explain_cache[sql]
+        if parameters is None:
+            return '(실행 계획 없음: executemany)'
+        try:
+            rows = super().execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+            plan = '\n'.join(f'  {row[3]}' for row in rows) or '  (실행 계획 없음)'
+        except sqlite3.Error as e:
+            plan = f'  (실행 계획 없음: {e})'
+        if len(explain_cache) >= 256:
+            explain_cache.clear()
+        explain_cache[sql] = plan
+        return plan
+
+    def execute(self, sql, parameters=(), /):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._observe(sql, parameters, time.perf_counter() - started)
+
+    def executemany(self, sql, parameters, /):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            self._observe(sql, None, time.perf_counter() - started)
+
+
+def connect_db(path=None):
+    """새 SQLite 연결을 열고 PRAGMA를 설정 (연결당 한 번만 실행)"""
+    factory = InstrumentedConnection if METRICS_ENABLED else sqlite3.Connection
+    conn = sqlite3.connect(path or DB_PATH, timeout=DB_BUSY_TIMEOUT, check_same_thread=False, factory=factory)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA foreign_keys=ON")
+    if CHECKPOINT_INTERVAL:
+        conn.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT}")
     return conn
 
 
-def init_db():
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = get_db()
-    conn.executescript('''
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """요청 스레드들이 나눠 쓰는 크기 제한 SQLite 연결 풀"""
+
+    def __init__(self, path, size, timeout):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._closed = False
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._stats = {'hits': 0, 'misses': 0, 'waits': 0, 'wait_seconds': 0.0, 'timeouts': 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def acquire(self):
+        # fork된 워커는 부모 프로세스의 연결을 물려받지 않고 새로 시작
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+        try:
+            conn = self._idle.get_nowait()
+            self._count('hits')
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+                self._stats['misses'] += 1
+        if can_create:
+            try:
+                return connect_db(self.path)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        # 풀이 가득 찬 경우: 다른 요청이 연결을 반납할 때까지 대기
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            self._count('timeouts')
+            raise PoolTimeout()
+        finally:
+            with self._lock:
+                self._stats['waits'] += 1
+                self._stats['wait_seconds'] += time.perf_counter() - started
+        return conn
+
+    def release(self, conn):
+        if self._pid != os.getpid() or self._closed:
+            conn.close()
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # 망가진 연결은 버리고 다음 acquire에서 새로 생성
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._created
+        stats['idle'] = self._idle.qsize()
+        stats['in_use'] = stats['open'] - stats['idle']
+        stats['wait_seconds'] = round(stats['wait_seconds'], 6)
+        return stats
+
+    def close(self):
+        """쉬고 있는 연결을 닫음 (사용 중인 연결은 반납될 때 닫힘)"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def current_tenant():
+    """이 요청(또는 CLI 명령)의 학교, 여러 학교 모드가 아니면 항상 기본 학교(DB_PATH)"""
+    if has_app_context() and 'tenant' in g:
+        return g.tenant
+    return default_tenant
+
+
+def get_db():
+    """요청 중에는 학교 DB의 풀에서 연결을 빌려오고, 요청이 끝나면 teardown에서 반납"""
+    if not has_app_context():
+        return connect_db()
+    if 'db' not in g:
+        g.db = current_tenant().pool.acquire()
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db(exc=None):
+    # 핸들러에서 예외가 나도 연결은 항상 풀로 돌아감 (미완료 트랜잭션은 롤백)
+    conn = g.pop('db', None)
+    if conn is not None:
+        if g.pop('archive_attached', False):
+            detach_archive(conn)
+        if METRICS_ENABLED and 'metrics_endpoint' in g:
+            metrics.observe_request_queries(g.metrics_endpoint, conn.take_query_count())
+        current_tenant().pool.release(conn)
+    # 학교는 연결을 반납한 뒤에 놓아야 그 사이에 닫히지 않음
+    tenant = g.pop('tenant', None)
+    if tenant is not None:
+        tenant_registry.release(tenant)
+
+
+@app.before_request
+def start_request_timer():
+    if METRICS_ENABLED:
+        g.metrics_endpoint = request.endpoint or 'unmatched'
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_time(response):
+    if METRICS_ENABLED and 'request_started' in g:
+        metrics.observe_request(g.metrics_endpoint, request.method, response.status_code,
+                                time.perf_counter() - g.request_started)
+    return response
+
+
+class DatabaseBusy(Exception):
+    pass
+
+
+def begin_immediate(conn):
+    """BEGIN IMMEDIATE, 다른 프로세스가 busy_timeout보다 오래 잠그고 있으면 백오프 후 재시도"""
+    for attempt in range(DB_WRITE_RETRIES + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            if attempt == DB_WRITE_RETRIES:
+                metrics.count_lock('lock_failures')
+                raise DatabaseBusy() from e
+            metrics.count_lock('lock_retries')
+            time.sleep(random.uniform(0.5, 1) * 0.05 * 2 ** attempt)
+
+
+@contextmanager
+def write_transaction(conn, write_lock=None):
+    """쓰기 잠금을 먼저 잡고 블록을 실행한 뒤 커밋 (예외가 나면 롤백)
+
+    같은 프로세스의 쓰기 트랜잭션은 SQLite busy 대기(주기적으로 깨어나 재확인) 대신 학교 DB마다 하나인
+    잠금에서 줄을 선다 (요청 밖에서 쓸 때는 그 DB의 잠금을 넘김). 확인 후 쓰는 핸들러(오늘 질문 여부 확인 후
+    INSERT 등)는 확인부터 이 안에서 해야 동시에 들어온 요청이 같은 확인을 통과하지 않는다.
+    """
+    started = time.perf_counter()
+    write_lock = write_lock or current_tenant().write_lock
+    if not write_lock.acquire(timeout=DB_BUSY_TIMEOUT):
+        metrics.count_lock('lock_failures')
+        raise DatabaseBusy()
+    try:
+        begin_immediate(conn)
+        metrics.observe_lock_wait(time.perf_counter() - started)
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    finally:
+        write_lock.release()
+
+
+@app.errorhandler(PoolTimeout)
+@app.errorhandler(DatabaseBusy)
+def handle_pool_timeout(e):
+    return jsonify({'error': '접속자가 많아 잠시 지연되고 있어요. 잠시 후 다시 시도해주세요'}), 503
+
+
+# ── Schema Migrations ──
+
+# 시작할 때 PRAGMA user_version만 읽고, 번호가 MIGRATIONS보다 낮을 때만 잠금을 잡고 적용
+AUTO_MIGRATE = os.environ.get('AUTO_MIGRATE', '1') == '1'
+MIGRATION_LOCK_TIMEOUT = 300  # 다른 워커가 마이그레이션 중일 때 기다리는 최대 시간(초)
+
+
+def run_script(conn, script):
+    """executescript와 달리 진행 중인 트랜잭션을 커밋하지 않도록 문장을 하나씩 실행"""
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ''
+
+
+def table_columns(conn, table):
+    return {r['name'] for r in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def migration_base_schema(conn):
+    """학생/질문/좋아요/관리자/설정 테이블과 기본 관리자 계정"""
+    run_script(conn, '''
         CREATE TABLE IF NOT EXISTS students (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             grade INTEGER NOT NULL,
@@ -94,44 +553,1170 @@ def init_db():
         CREATE INDEX IF NOT EXISTS idx_likes_student ON likes(student_id);
     ''')
 
-    # 기존 DB 마이그레이션: pin_hash 컬럼이 없으면 추가
-    try:
-        conn.execute("SELECT pin_hash FROM students LIMIT 1")
-    except sqlite3.OperationalError:
+    # 예전 DB: pin_hash, pin(평문 비밀번호 저장용) 컬럼이 없으면 추가
+    columns = table_columns(conn, 'students')
+    if 'pin_hash' not in columns:
         conn.execute("ALTER TABLE students ADD COLUMN pin_hash TEXT DEFAULT NULL")
+    if 'pin' not in columns:
+        conn.execute("ALTER TABLE students ADD COLUMN pin TEXT DEFAULT NULL")
+
+    pw_hash = hashlib.sha256('admin123'.encode()).hexdigest()
+    conn.execute("INSERT OR IGNORE INTO admins (username, password_hash) VALUES (?, ?)", ('admin', pw_hash))
+
+
+def migration_like_count(conn):
+    """questions.like_count 컬럼과 좋아요 추가/취소 시 같은 트랜잭션에서 갱신하는 트리거"""
+    if 'like_count' not in table_columns(conn, 'questions'):
+        conn.execute("ALTER TABLE questions ADD COLUMN like_count INTEGER NOT NULL DEFAULT 0")
+        conn.execute(
+            "UPDATE questions SET like_count = (SELECT COUNT(*) FROM likes WHERE question_id = questions.id)"
+        )
+    run_script(conn, '''
+        CREATE TRIGGER IF NOT EXISTS trg_likes_insert AFTER INSERT ON likes
+        BEGIN
+            UPDATE questions SET like_count = like_count + 1 WHERE id = NEW.question_id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_likes_delete AFTER DELETE ON likes
+        BEGIN
+            UPDATE questions SET like_count = like_count - 1 WHERE id = OLD.question_id;
+        END;
+    ''')
+
+
+def migration_feed_versions(conn):
+    """날짜별 피드 버전 (피드 캐시, ETag용)"""
+    run_script(conn, '''
+        CREATE TABLE IF NOT EXISTS feed_versions (
+            created_date TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+
+        -- 날짜별 피드 버전: 질문 작성/수정/삭제/복원과 좋아요 수 변경 시 증가 (피드 캐시, ETag용)
+        CREATE TRIGGER IF NOT EXISTS trg_questions_insert_feed AFTER INSERT ON questions
+        BEGIN
+            INSERT INTO feed_versions (created_date, version) VALUES (NEW.created_date, 1)
+            ON CONFLICT(created_date) DO UPDATE SET version = version + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_questions_update_feed
+        AFTER UPDATE OF content, is_deleted, like_count ON questions
+        BEGIN
+            INSERT INTO feed_versions (created_date, version) VALUES (NEW.created_date, 1)
+            ON CONFLICT(created_date) DO UPDATE SET version = version + 1;
+        END;
+    ''')
+
+
+def migration_events(conn):
+    """실시간 알림용 events 테이블"""
+    run_script(conn, '''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    ''')
+
+
+def migration_hall_scores(conn):
+    """명예의 전당 점수 테이블, 트리거, 기존 질문으로 채우기"""
+    run_script(conn, '''
+        -- 명예의 전당: hall_reset_date 이후 학생별 질문 수 (정렬용으로 학년/반/번호를 함께 보관)
+        CREATE TABLE IF NOT EXISTS hall_scores (
+            student_id INTEGER PRIMARY KEY,
+            grade INTEGER NOT NULL,
+            class_num INTEGER NOT NULL,
+            student_num INTEGER NOT NULL,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (student_id) REFERENCES students(id)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_hall_scores_rank
+            ON hall_scores(question_count DESC, grade, class_num, student_num);
+
+        -- 명예의 전당 점수: 초기화 날짜 이후 질문의 작성/삭제/복원을 바로 반영
+        CREATE TRIGGER IF NOT EXISTS trg_questions_insert_hall AFTER INSERT ON questions
+        WHEN NEW.is_deleted = 0 AND NEW.created_date >=
+             COALESCE((SELECT value FROM settings WHERE key = 'hall_reset_date'), '2000-01-01')
+        BEGIN
+            INSERT INTO hall_scores (student_id, grade, class_num, student_num, question_count)
+            SELECT id, grade, class_num, student_num, 1 FROM students WHERE id = NEW.student_id
+            ON CONFLICT(student_id) DO UPDATE SET question_count = question_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_questions_restore_hall AFTER UPDATE OF is_deleted ON questions
+        WHEN OLD.is_deleted != 0 AND NEW.is_deleted = 0 AND NEW.created_date >=
+             COALESCE((SELECT value FROM settings WHERE key = 'hall_reset_date'), '2000-01-01')
+        BEGIN
+            INSERT INTO hall_scores (student_id, grade, class_num, student_num, question_count)
+            SELECT id, grade, class_num, student_num, 1 FROM students WHERE id = NEW.student_id
+            ON CONFLICT(student_id) DO UPDATE SET question_count = question_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_questions_delete_hall AFTER UPDATE OF is_deleted ON questions
+        WHEN OLD.is_deleted = 0 AND NEW.is_deleted != 0 AND NEW.created_date >=
+             COALESCE((SELECT value FROM settings WHERE key = 'hall_reset_date'), '2000-01-01')
+        BEGIN
+            UPDATE hall_scores SET question_count = question_count - 1 WHERE student_id = NEW.student_id;
+            DELETE FROM hall_scores WHERE student_id = NEW.student_id AND question_count <= 0;
+        END;
+    ''')
+    rebuild_hall_scores(conn)
+
+
+def migration_daily_stats(conn):
+    """날짜별/학년별 집계 테이블, 트리거, 기존 데이터로 채우기"""
+    run_script(conn, '''
+        -- 날짜별 집계: 삭제되지 않은 질문 수와 그 날짜 질문들이 받은 좋아요 수
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            created_date TEXT PRIMARY KEY,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            like_count INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS grade_daily_stats (
+            created_date TEXT NOT NULL,
+            grade INTEGER NOT NULL,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (created_date, grade)
+        );
 
-    # 기존 DB 마이그레이션: pin 컬럼이 없으면 추가 (평문 비밀번호 저장용)
+        -- 날짜별/학년별 집계 (관리자 통계, 날짜 목록용)
+        CREATE TRIGGER IF NOT EXISTS trg_questions_insert_stats AFTER INSERT ON questions
+        WHEN NEW.is_deleted = 0
+        BEGIN
+            INSERT INTO daily_stats (created_date, question_count) VALUES (NEW.created_date, 1)
+            ON CONFLICT(created_date) DO UPDATE SET question_count = question_count + 1;
+            INSERT INTO grade_daily_stats (created_date, grade, question_count)
+            SELECT NEW.created_date, grade, 1 FROM students WHERE id = NEW.student_id
+            ON CONFLICT(created_date, grade) DO UPDATE SET question_count = question_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_questions_restore_stats AFTER UPDATE OF is_deleted ON questions
+        WHEN OLD.is_deleted != 0 AND NEW.is_deleted = 0
+        BEGIN
+            INSERT INTO daily_stats (created_date, question_count) VALUES (NEW.created_date, 1)
+            ON CONFLICT(created_date) DO UPDATE SET question_count = question_count + 1;
+            INSERT INTO grade_daily_stats (created_date, grade, question_count)
+            SELECT NEW.created_date, grade, 1 FROM students WHERE id = NEW.student_id
+            ON CONFLICT(created_date, grade) DO UPDATE SET question_count = question_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_questions_delete_stats AFTER UPDATE OF is_deleted ON questions
+        WHEN OLD.is_deleted = 0 AND NEW.is_deleted != 0
+        BEGIN
+            UPDATE daily_stats SET question_count = question_count - 1 WHERE created_date = NEW.created_date;
+            UPDATE grade_daily_stats SET question_count = question_count - 1
+            WHERE created_date = NEW.created_date
+              AND grade = (SELECT grade FROM students WHERE id = NEW.student_id);
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_likes_insert_stats AFTER INSERT ON likes
+        BEGIN
+            INSERT INTO daily_stats (created_date, like_count)
+            SELECT created_date, 1 FROM questions WHERE id = NEW.question_id
+            ON CONFLICT(created_date) DO UPDATE SET like_count = like_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_likes_delete_stats AFTER DELETE ON likes
+        BEGIN
+            UPDATE daily_stats SET like_count = like_count - 1
+            WHERE created_date = (SELECT created_date FROM questions WHERE id = OLD.question_id);
+        END;
+    ''')
+    rebuild_daily_stats(conn)
+
+
+def migration_feed_indexes(conn):
+    """피드 정렬 순서별 부분 인덱스 (임시 B-tree 정렬 없이 키셋 페이지네이션)"""
+    run_script(conn, '''
+        CREATE INDEX IF NOT EXISTS idx_questions_feed_latest
+            ON questions(created_date, created_at, id) WHERE is_deleted = 0;
+        CREATE INDEX IF NOT EXISTS idx_questions_feed_likes
+            ON questions(created_date, like_count, created_at, id) WHERE is_deleted = 0;
+    ''')
+
+
+def migration_search_index(conn):
+    """삭제되지 않은 질문만 담는 FTS5 trigram 검색 색인 (지원하지 않는 SQLite면 건너뛰고 LIKE 검색)"""
     try:
-        conn.execute("SELECT pin FROM students LIMIT 1")
-    except sqlite3.OperationalError:
-        conn.execute("ALTER TABLE students ADD COLUMN pin TEXT DEFAULT NULL")
+        run_script(conn, '''
+            CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+                content, content='questions', content_rowid='id', tokenize='trigram'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS trg_questions_insert_fts AFTER INSERT ON questions
+            WHEN NEW.is_deleted = 0
+            BEGIN
+                INSERT INTO questions_fts (rowid, content) VALUES (NEW.id, NEW.content);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_questions_update_fts AFTER UPDATE OF content, is_deleted ON questions
+            BEGIN
+                INSERT INTO questions_fts (questions_fts, rowid, content)
+                SELECT 'delete', OLD.id, OLD.content WHERE OLD.is_deleted = 0;
+                INSERT INTO questions_fts (rowid, content)
+                SELECT NEW.id, NEW.content WHERE NEW.is_deleted = 0;
+            END;
+        ''')
+    except sqlite3.OperationalError as e:
+        app.logger.warning('FTS5 trigram 검색 색인을 만들 수 없어 LIKE 검색을 사용합니다: %s', e)
+        return
+    rebuild_search_index(conn)
+
+
+def migration_query_indexes(conn):
+    """실제 쿼리 모양에 맞춘 복합/부분 인덱스 (python -m bench.plans로 확인)"""
+    run_script(conn, '''
+        -- 오늘 이미 썼는지 확인, 학생별 질문 수, 명예의 전당 재계산, 기간별 내보내기
+        -- 학생별 조회는 모두 삭제되지 않은 질문만 보므로 student_id 단일 인덱스를 대체
+        CREATE INDEX IF NOT EXISTS idx_questions_student_date
+            ON questions(student_id, created_date) WHERE is_deleted = 0;
+        DROP INDEX IF EXISTS idx_questions_student;
+
+        -- 관리자 질문 목록: 삭제된 질문 포함, 작성 시각 역순 (created_date 단일 인덱스를 대체)
+        CREATE INDEX IF NOT EXISTS idx_questions_date_created ON questions(created_date, created_at);
+        DROP INDEX IF EXISTS idx_questions_date;
+
+        -- 관리자 통계의 좋아요 TOP 10: 좋아요 받은 질문만 담음
+        CREATE INDEX IF NOT EXISTS idx_questions_top_likes
+            ON questions(like_count, created_date) WHERE is_deleted = 0 AND like_count > 0;
+
+        -- 학년별 질문 수 합계 (임시 B-tree 없이 GROUP BY)
+        CREATE INDEX IF NOT EXISTS idx_grade_daily_stats_grade ON grade_daily_stats(grade, question_count);
+
+        -- UNIQUE(question_id, student_id) 인덱스가 같은 조회를 처리하므로 쓰기마다 갱신할 필요 없음
+        DROP INDEX IF EXISTS idx_likes_question;
+    ''')
+    conn.execute("ANALYZE")
 
-    # Create default admin account if not exists
-    admin = conn.execute("SELECT id FROM admins WHERE username = 'admin'").fetchone()
-    if not admin:
-        pw_hash = hashlib.sha256('admin123'.encode()).hexdigest()
-        conn.execute("INSERT INTO admins (username, password_hash) VALUES (?, ?)", ('admin', pw_hash))
 
-    conn.commit()
-    conn.close()
+def migration_likes_viewer_index(conn):
+    """보는 학생의 좋아요를 질문 id 범위로 읽는 likes(student_id, question_id) 인덱스"""
+    run_script(conn, '''
+        -- 피드의 liked_by_me: 학생 한 명의 좋아요 중 그날 질문 id 범위만 인덱스에서 바로 읽음 (questions 조인 없음)
+        CREATE INDEX IF NOT EXISTS idx_likes_student_question ON likes(student_id, question_id);
+        DROP INDEX IF EXISTS idx_likes_student;
+    ''')
+    conn.execute("ANALYZE likes")
+
+
+def migration_grade_student_stats(conn):
+    """학년별 학생 수 집계 테이블과 트리거 (관리자 통계가 매번 students를 세지 않도록)"""
+    run_script(conn, '''
+        CREATE TABLE IF NOT EXISTS grade_student_stats (
+            grade INTEGER PRIMARY KEY,
+            student_count INTEGER NOT NULL DEFAULT 0
+        );
+
+        CREATE TRIGGER IF NOT EXISTS trg_students_insert_stats AFTER INSERT ON students
+        BEGIN
+            INSERT INTO grade_student_stats (grade, student_count) VALUES (NEW.grade, 1)
+            ON CONFLICT(grade) DO UPDATE SET student_count = student_count + 1;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_students_delete_stats AFTER DELETE ON students
+        BEGIN
+            UPDATE grade_student_stats SET student_count = student_count - 1 WHERE grade = OLD.grade;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_students_grade_stats AFTER UPDATE OF grade ON students
+        WHEN OLD.grade != NEW.grade
+        BEGIN
+            UPDATE grade_student_stats SET student_count = student_count - 1 WHERE grade = OLD.grade;
+            INSERT INTO grade_student_stats (grade, student_count) VALUES (NEW.grade, 1)
+            ON CONFLICT(grade) DO UPDATE SET student_count = student_count + 1;
+        END;
+    ''')
+    rebuild_student_stats(conn)
+
+
+# 순서가 곧 버전 번호 (1부터), 이미 배포된 단계는 고치지 말고 새 단계를 뒤에 추가
+MIGRATIONS = [
+    migration_base_schema,
+    migration_like_count,
+    migration_feed_versions,
+    migration_events,
+    migration_hall_scores,
+    migration_daily_stats,
+    migration_feed_indexes,
+    migration_search_index,
+    migration_query_indexes,
+    migration_likes_viewer_index,
+    migration_grade_student_stats,
+]
+
+
+def migrate(conn):
+    """아직 적용하지 않은 마이그레이션을 한 트랜잭션에서 적용하고, 적용한 번호 목록을 돌려줌
+
+    이 체계 이전의 DB(user_version 0)도 각 단계가 이미 있는 테이블/컬럼/트리거를 건너뛰므로 그대로 올라간다.
+    """
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= len(MIGRATIONS):
+        return []
+
+    # 여러 워커가 동시에 시작하면 하나만 적용하고 나머지는 잠금이 풀린 뒤 다시 확인
+    conn.execute(f"PRAGMA busy_timeout = {MIGRATION_LOCK_TIMEOUT * 1000}")
+    try:
+        conn.execute("BEGIN EXCLUSIVE")
+        try:
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            applied = []
+            for number, step in enumerate(MIGRATIONS[current:], start=current + 1):
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+                applied.append(number)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    finally:
+        conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT * 1000)}")
+    return applied
+
+
+def init_db(path=None):
+    path = path or DB_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = connect_db(path)
+    try:
+        if AUTO_MIGRATE:
+            migrate(conn)
+        elif conn.execute("PRAGMA user_version").fetchone()[0] < len(MIGRATIONS):
+            app.logger.warning('DB 스키마가 최신이 아닙니다. flask --app app migrate를 실행하세요.')
+    finally:
+        conn.close()
+
+
+# 설정값 캐시: 다른 워커 프로세스의 변경은 최대 SETTINGS_CACHE_TTL초 뒤에 반영됨
+SETTINGS_CACHE_TTL = float(os.environ.get('SETTINGS_CACHE_TTL', '2'))
+# flask archive가 archive_before를 옮긴 뒤 모든 워커가 새 값을 볼 때까지 기다리는 시간. 워커의 TTL이 아니라
+# archive를 실행한 프로세스의 환경으로 정해지므로, 워커마다 SETTINGS_CACHE_TTL을 다르게 주었다면
+# 가장 긴 TTL보다 길게 지정해야 한다 (짧으면 옛 값을 본 워커가 학교 DB에서 지워진 날짜를 빈 피드로 보여줌).
+ARCHIVE_SETTLE_SECONDS = float(os.environ.get('ARCHIVE_SETTLE_SECONDS', SETTINGS_CACHE_TTL + 1))
+SETTINGS_VERSION_KEY = 'settings_version'
+
+
+class SettingsCache:
+    """settings 테이블 전체를 메모리에 두고, TTL마다 settings_version 행 하나만 읽어 바뀌었을 때 다시 읽음"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = None
+        self._version = None
+        self._checked = 0.0
+
+    def get(self, conn, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            values, fresh = self._values, now - self._checked < self.ttl
+        if values is None or not fresh:
+            row = conn.execute("SELECT value FROM settings WHERE key = ?", (SETTINGS_VERSION_KEY,)).fetchone()
+            version = row['value'] if row else None
+            if values is None or version != self._version:
+                values = {r['key']: r['value'] for r in conn.execute("SELECT key, value FROM settings")}
+            with self._lock:
+                self._values, self._version, self._checked = values, version, now
+        return values.get(key, default)
+
+    def invalidate(self):
+        with self._lock:
+            self._checked = 0.0
 
 
 def get_setting(conn, key, default=None):
+    # 트랜잭션 안에서는 방금 쓴 값을 봐야 하므로 캐시를 거치지 않음
+    if not conn.in_transaction:
+        return current_tenant().settings_cache.get(conn, key, default)
     row = conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
     return row['value'] if row else default
 
 
 def set_setting(conn, key, value):
+    """write_transaction 안에서 값을 쓰고 settings_version을 올림
+
+    커밋한 뒤에 호출한 쪽이 settings_cache.invalidate()를 불러야 한다. 커밋 전에 무효화하면 그 사이에
+    들어온 요청이 옛 버전을 다시 읽어 캐시에 넣고, 이 워커는 TTL이 지날 때까지 새 값을 보지 못한다.
+    """
     conn.execute(
         "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = ?",
         (key, value, value)
     )
+    # 다른 워커는 버전이 바뀐 것을 보고 다시 읽음
+    conn.execute(
+        "INSERT INTO settings (key, value) VALUES (?, '1') "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+        (SETTINGS_VERSION_KEY,)
+    )
+
+
+# ── Feed Cache ──
+
+FEED_CACHE_SIZE = int(os.environ.get('FEED_CACHE_SIZE', '64'))
+
+
+class FeedCache:
+    """(날짜, 정렬)별로 모든 학생이 공유하는 피드 스냅샷 (feed_versions 버전이 바뀌면 다시 조회)"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, version, rows):
+        with self._lock:
+            self._entries[key] = (version, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def get_feed_versions(conn, *dates):
+    rows = conn.execute(
+        f"SELECT created_date, version FROM feed_versions WHERE created_date IN ({','.join('?' * len(dates))})",
+        dates
+    ).fetchall()
+    versions = {r['created_date']: r['version'] for r in rows}
+    return [versions.get(d, 0) for d in dates]
+
+
+FEED_PAGE_MAX = 100
+
+# 정렬별 ORDER BY와 키셋 커서를 이루는 컬럼 (마지막 id로 동점 구분)
+FEED_ORDERS = {
+    'latest': ('q.created_at DESC, q.id DESC', ('created_at', 'id')),
+    'likes': ('q.like_count DESC, q.created_at DESC, q.id DESC', ('like_count', 'created_at', 'id')),
+}
+
+
+def feed_row(q):
+    """(질문 dict, 작성자 student_id) — 작성자 id는 is_mine 계산에만 쓰고 응답에는 넣지 않음"""
+    return ({
+        'id': q['id'],
+        'content': q['content'],
+        'created_at': q['created_at'],
+        'created_date': q['created_date'],
+        'author': f"{q['grade']}-{q['class_num']} {q['name']}",
+        'grade': q['grade'],
+        'class_num': q['class_num'],
+        'like_count': q['like_count']
+    }, q['student_id'])
+
+
+def liked_question_ids(conn, student_id, question_ids, likes_table='likes'):
+    """question_ids 중 student_id가 좋아요한 질문 id 집합
+
+    idx_likes_student_question에서 (student_id, 가장 작은 id ~ 가장 큰 id) 범위 하나만 읽는다.
+    질문 id는 작성 순서대로 늘어나므로 하루치 질문의 id는 좁은 범위에 모여 있다.
+    """
+    if not question_ids:
+        return set()
+    wanted = set(question_ids)
+    return {r['question_id'] for r in conn.execute(
+        f"SELECT question_id FROM {likes_table} WHERE student_id = ? AND question_id BETWEEN ? AND ?",
+        (student_id, min(wanted), max(wanted))
+    ) if r['question_id'] in wanted}
+
+
+def personalize_feed(conn, student_id, rows, liked_ids, archived=False):
+    """공용 피드 행(모든 학생이 같이 씀)에 학생별 값(liked_by_me, is_mine)만 덧씌운 응답용 목록
+
+    archived: 보관 DB에서 읽은 날짜 (좋아요/수정/삭제가 안 되므로 클라이언트가 버튼을 끔)
+    """
+    result = [{
+        **q,
+        'liked_by_me': q['id'] in liked_ids,
+        'is_mine': author_id == student_id,
+        'archived': archived
+    } for q, author_id in rows]
+    if LIKE_WRITE_BEHIND:
+        current_tenant().like_buffer.overlay(conn, student_id, result)
+    return result
+
+
+def load_feed(conn, target_date, sort, table='questions'):
+    """보는 학생과 무관한 하루치 공용 피드 행 목록 (table: 보관된 날짜면 archive.questions)"""
+    order, _ = FEED_ORDERS[sort]
+    questions = conn.execute(f'''
+        SELECT q.id, q.student_id, q.content, q.created_at, q.created_date, q.like_count,
+               s.grade, s.class_num, s.name
+        FROM {table} q
+        JOIN students s ON q.student_id = s.id
+        WHERE q.created_date = ? AND q.is_deleted = 0
+        ORDER BY {order}
+    ''', (target_date,)).fetchall()
+    return [feed_row(q) for q in questions]
+
+
+def encode_feed_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_feed_cursor(cursor, sort):
+    """커서 문자열 → 키 값 목록 (잘못된 커서는 ValueError)"""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(cursor)
+    if not isinstance(key, list) or len(key) != len(FEED_ORDERS[sort][1]):
+        raise ValueError(cursor)
+    # 키 값은 작성 시각(문자열)과 좋아요 수/id(정수)뿐, 그 밖의 값은 SQL에 바인딩할 수 없음
+    if not all(isinstance(v, (int, str)) and not isinstance(v, bool) for v in key):
+        raise ValueError(cursor)
+    return key
+
+
+def feed_filter_sql(grade, class_num):
+    sql, params = '', []
+    if grade is not None:
+        sql += ' AND s.grade = ?'
+        params.append(grade)
+    if class_num is not None:
+        sql += ' AND s.class_num = ?'
+        params.append(class_num)
+    return sql, params
+
+
+def load_feed_page(conn, target_date, sort, after, limit, grade=None, class_num=None, table='questions'):
+    """키셋 페이지네이션: after(이전 페이지 마지막 행의 키) 다음부터 limit개와 다음 커서"""
+    order, key_columns = FEED_ORDERS[sort]
+    filter_sql, params = feed_filter_sql(grade, class_num)
+    if after is not None:
+        columns = ', '.join(f'q.{c}' for c in key_columns)
+        filter_sql += f" AND ({columns}) < ({', '.join('?' * len(key_columns))})"
+        params += after
+
+    # CROSS JOIN: 항상 questions 인덱스 순서대로 읽도록 조인 순서를 고정 (학년/반은 읽으면서 거름)
+    questions = conn.execute(f'''
+        SELECT q.id, q.student_id, q.content, q.created_at, q.created_date, q.like_count,
+               s.grade, s.class_num, s.name
+        FROM {table} q
+        CROSS JOIN students s ON q.student_id = s.id
+        WHERE q.created_date = ? AND q.is_deleted = 0{filter_sql}
+        ORDER BY {order}
+        LIMIT ?
+    ''', [target_date, *params, limit + 1]).fetchall()
+
+    next_cursor = None
+    if len(questions) > limit:
+        questions = questions[:limit]
+        last = questions[-1]
+        next_cursor = encode_feed_cursor([last[c] for c in key_columns])
+    return [feed_row(q) for q in questions], next_cursor
+
+
+def count_feed(conn, target_date, grade=None, class_num=None, table='questions'):
+    # daily_stats는 보관한 날짜도 학교 DB에 남아 있음
+    if grade is None and class_num is None:
+        row = conn.execute(
+            "SELECT question_count FROM daily_stats WHERE created_date = ?", (target_date,)
+        ).fetchone()
+        return row['question_count'] if row else 0
+    filter_sql, params = feed_filter_sql(grade, class_num)
+    return conn.execute(f'''
+        SELECT COUNT(*) as cnt
+        FROM {table} q
+        CROSS JOIN students s ON q.student_id = s.id
+        WHERE q.created_date = ? AND q.is_deleted = 0{filter_sql}
+    ''', [target_date, *params]).fetchone()['cnt']
+
+
+# ── Archive ──
+
+# 지난 학기 질문/좋아요는 `flask archive`로 학교 DB 옆의 보관 DB(<학교 DB 이름>.archive.db)로 옮긴다.
+# 학교 DB에는 archive_before 설정(이 날짜 이전 질문은 보관 DB에 있음)과 날짜별 집계만 남고,
+# 지난 날짜를 조회/내보내기/검색할 때만 요청 연결에 보관 DB를 ATTACH해서 읽는다 (웹 앱은 읽기만 함).
+ARCHIVE_SCHEMA = 'archive'
+ARCHIVE_BEFORE_KEY = 'archive_before'
+
+
+def archive_path(path=None):
+    """학교 DB path(기본: 이 요청의 학교)에 딸린 보관 DB 경로"""
+    return os.path.splitext(path or current_tenant().path)[0] + '.archive.db'
+
+
+def init_archive(path):
+    """보관 DB와 테이블을 만듦 (학교 DB의 questions/likes와 같은 컬럼, 트리거와 외래 키 없음)"""
+    conn = connect_db(path)
+    try:
+        run_script(conn, '''
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY,
+                student_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                created_date TEXT NOT NULL,
+                created_at TIMESTAMP,
+                is_deleted INTEGER DEFAULT 0,
+                like_count INTEGER NOT NULL DEFAULT 0
+            );
+
+            CREATE TABLE IF NOT EXISTS likes (
+                id INTEGER PRIMARY KEY,
+                question_id INTEGER NOT NULL,
+                student_id INTEGER NOT NULL,
+                created_at TIMESTAMP,
+                UNIQUE(question_id, student_id)
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_questions_date_created ON questions(created_date, created_at);
+            CREATE INDEX IF NOT EXISTS idx_questions_top_likes
+                ON questions(like_count, created_date) WHERE is_deleted = 0 AND like_count > 0;
+            CREATE INDEX IF NOT EXISTS idx_questions_student_date ON questions(student_id, created_date);
+            CREATE INDEX IF NOT EXISTS idx_likes_student_question ON likes(student_id, question_id);
+            DROP INDEX IF EXISTS idx_likes_student;
+        ''')
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+                    content, content='questions', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            pass  # 학교 DB처럼 LIKE 검색
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def attach_archive(conn):
+    """보관 DB가 있으면 연결에 archive로 붙이고 True (풀 연결은 반납할 때 release_db에서 뗌)"""
+    if conn.execute("SELECT 1 FROM pragma_database_list WHERE name = ?", (ARCHIVE_SCHEMA,)).fetchone():
+        return True
+    path = archive_path()
+    if not os.path.exists(path):
+        return False
+    conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+    if has_app_context():
+        g.archive_attached = True
+    return True
+
+
+def detach_archive(conn):
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+    except sqlite3.Error:
+        pass  # 떼지 못한 연결도 그대로 쓸 수 있음 (다음 attach_archive가 붙어 있는 것을 확인)
+
+
+def feed_tables(conn, target_date):
+    """target_date의 (questions, likes) 테이블 이름 (보관된 날짜면 보관 DB를 붙여서 archive.*)"""
+    before = get_setting(conn, ARCHIVE_BEFORE_KEY)
+    if before and target_date < before and attach_archive(conn):
+        return f'{ARCHIVE_SCHEMA}.questions', f'{ARCHIVE_SCHEMA}.likes'
+    return 'questions', 'likes'
+
+
+def range_tables(conn, start_date, end_date):
+    """[start_date, end_date] 기간을 학교 DB와 보관 DB로 나눈 (questions 테이블, 시작, 끝) 목록 (최근 쪽이 먼저)"""
+    before = get_setting(conn, ARCHIVE_BEFORE_KEY)
+    if not before or start_date >= before or not attach_archive(conn):
+        return [('questions', start_date, end_date)]
+    last_archived = (date.fromisoformat(before) - timedelta(days=1)).isoformat()
+    parts = [('questions', before, end_date)] if end_date >= before else []
+    parts.append((f'{ARCHIVE_SCHEMA}.questions', start_date, min(end_date, last_archived)))
+    return parts
+
+
+def missing_question_ids(conn, question_ids):
+    """question_ids 중 학교 DB에 없는 id 목록"""
+    return [r[0] for r in conn.execute(
+        "SELECT value FROM json_each(?) j WHERE NOT EXISTS (SELECT 1 FROM questions WHERE id = j.value)",
+        (json.dumps(question_ids),)
+    )]
+
+
+def missing_question_response(conn, question_ids):
+    """학교 DB에 없는 질문을 바꾸려 할 때의 오류 응답: 보관 DB로 옮겨졌으면 409, 아니면 404
+
+    보관된 질문은 읽기 전용 (웹 앱은 보관 DB에 쓰지 않음). 트랜잭션 밖에서 호출 (ATTACH는 트랜잭션 안에서 못 함).
+    """
+    if get_setting(conn, ARCHIVE_BEFORE_KEY) and attach_archive(conn) and conn.execute(
+        f"SELECT 1 FROM {ARCHIVE_SCHEMA}.questions WHERE id IN (SELECT value FROM json_each(?)) LIMIT 1",
+        (json.dumps(question_ids),)
+    ).fetchone():
+        return jsonify({'error': '보관된 지난 질문은 바꿀 수 없습니다', 'archived': True}), 409
+    return jsonify({'error': '질문을 찾을 수 없습니다'}), 404
+
+# ── Live Events ──
+
+# 실시간 이벤트 설정: 새 이벤트 확인 주기(초), 보관 기간(초), 스트림 하나의 최대 유지 시간(초)
+# 열린 탭마다 스트림이 워커(스레드) 하나를 최대 STREAM_MAX_SECONDS초 붙잡으므로 기본은 끔.
+# 스레드/비동기 워커로 동시 연결을 감당할 수 있을 때만 켠다 (꺼져 있으면 클라이언트는 30초 폴링).
+STREAM_ENABLED = os.environ.get('STREAM_ENABLED', '0') == '1'
+EVENT_POLL_INTERVAL = float(os.environ.get('EVENT_POLL_INTERVAL', '0.5'))
+EVENT_RETENTION = int(os.environ.get('EVENT_RETENTION', '86400'))
+STREAM_MAX_SECONDS = int(os.environ.get('STREAM_MAX_SECONDS', '300'))
+STREAM_HEARTBEAT = 15
+EVENT_PRUNE_EVERY = 500  # 이벤트 id가 이 배수일 때마다 보관 기간이 지난 이벤트를 지움
+
+
+def publish_event(conn, kind, **data):
+    """events 테이블에 이벤트 기록 (호출한 쪽의 트랜잭션과 함께 커밋됨)
+
+    보관 기간이 지난 이벤트 정리도 여기서 한다. 스트림(기본 꺼짐)이나 구독자 유무와 상관없이 이벤트가
+    쌓이는 쓰기 경로에서 EVENT_PRUNE_EVERY건마다 한 번씩 같은 트랜잭션에서 지운다.
+    정리된 구간보다 오래된 커서로 /api/questions/changes를 부르면 reset=true로 전체를 다시 받는다.
+    """
+    event_id = conn.execute(
+        "INSERT INTO events (kind, data) VALUES (?, ?)",
+        (kind, json.dumps(data, ensure_ascii=False))
+    ).lastrowid
+    if event_id % EVENT_PRUNE_EVERY == 0:
+        conn.execute("DELETE FROM events WHERE created_at < datetime('now', ?)", (f'-{EVENT_RETENTION} seconds',))
+
+
+def publish_question_events(conn, action, ids):
+    rows = conn.execute(
+        f"SELECT id, created_date FROM questions WHERE id IN ({','.join('?' * len(ids))})", ids
+    ).fetchall()
+    for r in rows:
+        publish_event(conn, 'question', action=action, id=r['id'], date=r['created_date'])
+
+
+def latest_event_id(conn):
+    """지금까지 발급된 가장 큰 이벤트 id (오래된 이벤트가 모두 정리되어도 줄어들지 않음)"""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+    return row['seq'] if row else 0
+
+
+class EventBroker:
+    """워커 프로세스마다 스레드 하나가 events 테이블을 따라 읽고, 이 워커의 SSE 구독자들에게 나눠줌"""
+
+    def __init__(self, path, poll_interval):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._thread = None
+        self._pid = os.getpid()
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=1000)
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork된 워커는 부모의 스레드를 물려받지 않음
+                self._pid = os.getpid()
+                self._subscribers = set()
+                self._thread = None
+            self._subscribers.add(q)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='event-broker', daemon=True)
+                self._thread.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def is_subscribed(self, q):
+        with self._lock:
+            return q in self._subscribers
+
+    def _run(self):
+        conn = connect_db(self.path)
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        # 구독자가 없으면 스레드 종료 (다음 구독 때 다시 시작)
+                        self._thread = None
+                        return
+                    subscribers = list(self._subscribers)
+
+                rows = conn.execute(
+                    "SELECT id, kind, data FROM events WHERE id > ? ORDER BY id LIMIT 500", (last_id,)
+                ).fetchall()
+                for r in rows:
+                    last_id = r['id']
+                    for q in subscribers:
+                        try:
+                            q.put_nowait((r['id'], r['kind'], r['data']))
+                        except queue.Full:
+                            # 너무 느린 클라이언트는 끊고, 재접속 시 Last-Event-ID로 따라잡게 함
+                            self.unsubscribe(q)
+
+                if not rows:
+                    time.sleep(self.poll_interval)
+        finally:
+            conn.close()
+
+
+def format_sse(event_id, kind, data):
+    return f'id: {event_id}\nevent: {kind}\ndata: {data}\n\n'
+
+
+# ── Like Write-Behind ──
+
+# 켜면 좋아요를 메모리에서 바로 처리하고 LIKE_FLUSH_INTERVAL초마다 모아서 기록 (워커 프로세스가 하나일 때만 사용)
+LIKE_WRITE_BEHIND = os.environ.get('LIKE_WRITE_BEHIND', '0') == '1'
+LIKE_FLUSH_INTERVAL = float(os.environ.get('LIKE_FLUSH_INTERVAL', '1'))
+LIKE_BUFFER_QUESTIONS = 2000  # 좋아요 집합을 메모리에 둘 최대 질문 수
+LIKE_JOURNAL = os.path.join(os.path.dirname(DB_PATH), 'likes.journal')
+
+
+class LikeBuffer:
+    """질문별 좋아요 집합을 메모리에 두고, 바뀐 (질문, 학생) 상태만 주기적으로 한 트랜잭션에 기록
+
+    변경은 기록 전에 저널 파일에 "질문id 학생id 1|0" 한 줄로 덧붙인다. 줄마다 최종 상태를 적으므로
+    다시 적용해도 결과가 같고, 프로세스가 죽으면 다음 시작 때 저널을 다시 적용해 복구한다.
+    저널은 줄마다 OS에 넘길 뿐 fsync하지 않으므로(좋아요마다 디스크를 기다리지 않게), 정전이나 OS가
+    멈춘 경우에는 마지막 기록 주기(LIKE_FLUSH_INTERVAL) 동안의 좋아요를 잃을 수 있다.
+    """
+
+    def __init__(self, path, journal_path, interval, write_lock):
+        self.path = path
+        self.journal_path = journal_path
+        self.interval = interval
+        self.write_lock = write_lock
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+
+    def start(self):
+        """저널에 남은 변경을 DB에 기록하고 기록 스레드를 시작 (학교 DB를 열 때, 이미 시작했으면 그대로)"""
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        # self._lock을 잡은 상태에서 호출, 프로세스마다 처음 한 번 저널 복구 후 기록 스레드 시작
+        # (fork된 워커는 부모의 스레드를 물려받지 않으므로 첫 사용 때 다시 시작)
+        if self._pid == os.getpid():
+            return
+        self._likers = OrderedDict()   # question_id -> {student_id, ...}
+        self._pending = {}             # (question_id, student_id) -> 좋아요 여부, 아직 기록 전
+        self._flushing = {}            # 지금 기록 중인 변경 (기록이 끝날 때까지 집합 계산에 포함)
+        self._versions = {}            # created_date -> 변경 횟수 (피드 ETag용)
+        self._conn = None
+        changes = self._read_journal()
+        if changes:
+            conn = connect_db(self.path)
+            try:
+                self._write(conn, changes)
+            finally:
+                conn.close()
+        self._journal = open(self.journal_path, 'w', encoding='utf-8')
+        self._pid = os.getpid()
+        # 시작할 때마다 새 멈춤 신호를 만들어, close() 뒤 다시 start()해도 이전 기록 스레드가 남지 않게 함
+        self._stop = threading.Event()
+        threading.Thread(target=self._run, args=(self._stop,), name='like-flusher', daemon=True).start()
+
+    def _read_journal(self):
+        changes = {}
+        if not os.path.exists(self.journal_path):
+            return changes
+        with open(self.journal_path, encoding='utf-8') as f:
+            for line in f:
+                parts = line.split()
+                # 마지막 줄이 쓰다 만 채로 남았을 수 있음
+                if len(parts) == 3 and all(p.isdigit() for p in parts):
+                    changes[(int(parts[0]), int(parts[1]))] = parts[2] == '1'
+        return changes
+
+    def _write(self, conn, changes):
+        liked = [(q, s, q) for (q, s), on in changes.items() if on]
+        unliked = [(q, s) for (q, s), on in changes.items() if not on]
+        question_ids = sorted({q for q, _ in changes})
+        with write_transaction(conn, self.write_lock):
+            conn.executemany(
+                "INSERT OR IGNORE INTO likes (question_id, student_id) "
+                "SELECT ?, ? WHERE EXISTS (SELECT 1 FROM questions WHERE id = ?)",
+                liked
+            )
+            conn.executemany("DELETE FROM likes WHERE question_id = ? AND student_id = ?", unliked)
+            # 클릭마다가 아니라 질문마다 최종 좋아요 수로 한 번씩 알림
+            for q in conn.execute(
+                "SELECT id, created_date, like_count FROM questions WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(question_ids),)
+            ).fetchall():
+                publish_event(conn, 'like', id=q['id'], date=q['created_date'], like_count=q['like_count'])
+
+    def _get_likers(self, conn, question_id):
+        likers = self._likers.get(question_id)
+        if likers is not None:
+            self._likers.move_to_end(question_id)
+            return likers
+        likers = {r[0] for r in conn.execute("SELECT student_id FROM likes WHERE question_id = ?", (question_id,))}
+        for changes in (self._flushing, self._pending):
+            for (q, s), on in changes.items():
+                if q == question_id:
+                    (likers.add if on else likers.discard)(s)
+        self._likers[question_id] = likers
+        if len(self._likers) > LIKE_BUFFER_QUESTIONS:
+            self._likers.popitem(last=False)
+        return likers
+
+    def toggle(self, conn, question_id, created_date, student_id):
+        """좋아요를 뒤집고 (좋아요 여부, 좋아요 수)를 돌려줌"""
+        with self._lock:
+            self._start()
+            likers = self._get_likers(conn, question_id)
+            liked = student_id not in likers
+            (likers.add if liked else likers.discard)(student_id)
+            self._pending[(question_id, student_id)] = liked
+            self._versions[created_date] = self._versions.get(created_date, 0) + 1
+            self._journal.write(f'{question_id} {student_id} {int(liked)}\n')
+            self._journal.flush()
+            return liked, len(likers)
+
+    def version(self, created_date):
+        with self._lock:
+            self._start()
+            return self._versions.get(created_date, 0)
+
+    def overlay(self, conn, student_id, questions):
+        """아직 기록되지 않은 변경을 피드의 like_count, liked_by_me에 반영"""
+        with self._lock:
+            self._start()
+            changed = {q for q, _ in self._pending} | {q for q, _ in self._flushing}
+            for question in questions:
+                if question['id'] in changed:
+                    likers = self._get_likers(conn, question['id'])
+                    question['like_count'] = len(likers)
+                    question['liked_by_me'] = student_id in likers
+
+    def flush(self):
+        """쌓인 변경을 한 트랜잭션으로 기록하고 기록한 건수를 돌려줌"""
+        with self._flush_lock:
+            with self._lock:
+                if self._pid != os.getpid() or not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+            try:
+                if self._conn is None:
+                    self._conn = connect_db(self.path)
+                self._write(self._conn, batch)
+            except Exception:
+                app.logger.exception('좋아요 %d건 기록 실패, 다음 주기에 다시 시도', len(batch))
+                with self._lock:
+                    self._pending = {**batch, **self._pending}
+                    self._flushing = {}
+                return 0
+            with self._lock:
+                self._flushing = {}
+                # 저널을 아직 기록되지 않은 변경만 남도록 새로 씀 (교체는 원자적)
+                self._journal.close()
+                with open(self.journal_path + '.tmp', 'w', encoding='utf-8') as f:
+                    f.writelines(f'{q} {s} {int(on)}\n' for (q, s), on in self._pending.items())
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(self.journal_path + '.tmp', self.journal_path)
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+            return len(batch)
+
+    def close(self):
+        """남은 변경을 기록하고 기록 스레드를 멈춤 (학교 DB를 닫을 때)"""
+        self.flush()
+        with self._flush_lock, self._lock:
+            if self._pid != os.getpid():
+                return
+            self._pid = None
+            self._stop.set()
+            self._journal.close()
+            if self._conn is not None:
+                self._conn.close()
+
+    def _run(self, stop):
+        while not stop.wait(self.interval):
+            self.flush()
+
+
+# ── Tenants ──
+
+class Tenant:
+    """학교 DB 하나에 딸린 상태: 연결 풀, 쓰기 잠금, 캐시, 실시간 이벤트, 좋아요 버퍼
+
+    학교마다 따로 두므로 한 학교의 글쓰기 몰림이 다른 학교의 쓰기 잠금이나 캐시에 영향을 주지 않는다.
+    """
+
+    def __init__(self, name, path, like_journal=None):
+        self.name = name
+        self.path = path
+        self.pool = ConnectionPool(path, DB_POOL_SIZE, DB_POOL_TIMEOUT)
+        self.write_lock = threading.Lock()
+        self.feed_cache = FeedCache(FEED_CACHE_SIZE)
+        self.settings_cache = SettingsCache(SETTINGS_CACHE_TTL)
+        self.event_broker = EventBroker(path, EVENT_POLL_INTERVAL)
+        self.like_buffer = LikeBuffer(path, like_journal or os.path.splitext(path)[0] + '.likes.journal',
+                                      LIKE_FLUSH_INTERVAL, self.write_lock)
+        self.search_fts = None  # FTS5 trigram 색인이 있는지 여부 (첫 검색 때 확인, False면 LIKE 검색)
+        self.active = 0         # 이 학교를 쓰고 있는 요청/스트림 수 (0일 때만 닫을 수 있음)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if LIKE_WRITE_BEHIND:
+            self.like_buffer.close()
+        self.pool.close()
+
+
+class TenantRegistry:
+    """학교 DB를 처음 요청될 때 열고(필요하면 마이그레이션), 오래 쉬었거나 개수를 넘으면 쓰지 않는 것부터 닫음"""
+
+    def __init__(self, directory, max_open, idle_seconds):
+        self.directory = directory
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._tenants = OrderedDict()
+
+    def path(self, name):
+        return os.path.join(self.directory, f'{name}.db')
+
+    def exists(self, name):
+        return bool(TENANT_NAME.match(name)) and os.path.exists(self.path(name))
+
+    def names(self):
+        """TENANT_DIR에 있는 학교 이름 목록 (보관 DB 같은 다른 .db 파일은 뺌)"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(n[:-3] for n in os.listdir(self.directory) if n.endswith('.db') and TENANT_NAME.match(n[:-3]))
+
+    def acquire(self, name):
+        """학교를 열어 사용 중으로 표시하고 돌려줌 (없는 학교면 None), 다 쓰면 release"""
+        with self._lock:
+            tenant = self._tenants.get(name)
+            if tenant is not None:
+                self._use(tenant)
+                idle = self._take_idle()
+        if tenant is not None:
+            self._close(idle)
+            return tenant
+        if not self.exists(name):
+            return None
+
+        # 마이그레이션은 잠금 밖에서 (다른 학교 요청을 막지 않도록, 동시 실행은 migrate가 처리)
+        init_db(self.path(name))
+        with self._lock:
+            tenant = self._tenants.get(name)
+            if tenant is None:
+                tenant = self._tenants[name] = Tenant(name, self.path(name))
+            self._use(tenant)
+            idle = self._take_idle()
+        self._close(idle)
+        if LIKE_WRITE_BEHIND:
+            tenant.like_buffer.start()
+        return tenant
+
+    def _use(self, tenant):
+        tenant.active += 1
+        tenant.last_used = time.monotonic()
+        self._tenants.move_to_end(tenant.name)
+        return tenant
+
+    def _take_idle(self):
+        # self._lock을 잡은 상태에서 호출, 닫을 학교를 목록에서 빼서 돌려줌 (닫기는 잠금 밖에서)
+        # 새 학교를 열 때뿐 아니라 요청마다(acquire/release) 확인 (학교 수가 적어 새로 여는 일이 드물어도 쉬는 DB를 닫음)
+        now = time.monotonic()
+        idle = []
+        for name, tenant in list(self._tenants.items()):
+            over = len(self._tenants) > self.max_open
+            if tenant.active == 0 and (over or now - tenant.last_used > self.idle_seconds):
+                idle.append(self._tenants.pop(name))
+        return idle
+
+    def _close(self, tenants):
+        for tenant in tenants:
+            try:
+                tenant.close()
+            except Exception:
+                app.logger.exception('%s 학교 DB 닫기 실패', tenant.name)
+
+    def retain(self, tenant):
+        if tenant is not default_tenant:
+            with self._lock:
+                tenant.active += 1
+
+    def release(self, tenant):
+        if tenant is default_tenant:
+            return
+        with self._lock:
+            tenant.active -= 1
+            tenant.last_used = time.monotonic()
+            idle = self._take_idle()
+        self._close(idle)
+
+    def close_all(self):
+        with self._lock:
+            tenants, self._tenants = list(self._tenants.values()), OrderedDict()
+        for tenant in tenants + [default_tenant]:
+            tenant.close()
+
+
+default_tenant = Tenant('default', DB_PATH, LIKE_JOURNAL)
+tenant_registry = TenantRegistry(TENANT_DIR, TENANT_MAX_OPEN, TENANT_IDLE_SECONDS)
+if LIKE_WRITE_BEHIND:
+    atexit.register(tenant_registry.close_all)
+
+
+class TenantPathMiddleware:
+    """/s/<학교>/... 요청을 SCRIPT_NAME=/s/<학교>, PATH_INFO=/...로 바꿔 라우트는 학교를 몰라도 되게 함"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        parts = environ.get('PATH_INFO', '').split('/', 3)
+        if len(parts) >= 3 and parts[1] == TENANT_PATH_PREFIX and parts[2]:
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + f'/{TENANT_PATH_PREFIX}/{parts[2]}'
+            environ['PATH_INFO'] = '/' + (parts[3] if len(parts) > 3 else '')
+            environ['daily_question.tenant'] = parts[2]
+        return self.wsgi_app(environ, start_response)
+
+
+if TENANT_MODE == 'path':
+    app.wsgi_app = TenantPathMiddleware(app.wsgi_app)
+
+
+def request_tenant_name():
+    if TENANT_MODE == 'host':
+        return request.host.split(':')[0].split('.')[0].lower()
+    return request.environ.get('daily_question.tenant')
+
+
+@app.before_request
+def resolve_tenant():
+    # 정적 파일은 학교와 무관 (/static/...은 학교 경로 밖에서도 그대로 제공)
+    if not TENANT_MODE or request.endpoint == 'static':
+        return None
+    name = request_tenant_name()
+    tenant = tenant_registry.acquire(name) if name else None
+    if tenant is None:
+        return jsonify({'error': '학교를 찾을 수 없습니다'}), 404
+    g.tenant = tenant
+    return None
+
+
+def session_tenant_ok():
+    # 한 브라우저 세션은 한 학교에만 로그인 (다른 학교 DB의 같은 id로 접근하지 못하게)
+    return not TENANT_MODE or session.get('tenant') == current_tenant().name
+
+
+def start_tenant_session():
+    if TENANT_MODE and session.get('tenant') != current_tenant().name:
+        session.clear()
+    session['tenant'] = current_tenant().name
 
 
 def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        if 'student_id' not in session:
+        if 'student_id' not in session or not session_tenant_ok():
             return jsonify({'error': '로그인이 필요합니다'}), 401
         return f(*args, **kwargs)
     return decorated
@@ -140,27 +1725,400 @@ def login_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        if 'admin_id' not in session:
+        if 'admin_id' not in session or not session_tenant_ok():
             return jsonify({'error': '관리자 로그인이 필요합니다'}), 401
         return f(*args, **kwargs)
     return decorated
 
 
+# ── Backups ──
+
+# 앱을 멈추지 않고 하는 온라인 백업: sqlite3 backup API로 BACKUP_PAGES 페이지씩 복사하고 묶음 사이에
+# BACKUP_SLEEP초 쉰다. 워커 프로세스마다 스케줄러 스레드가 뜨지만 BACKUP_DIR/.lock을 잡은 하나만 실행한다.
+BACKUP_DIR = os.environ.get('BACKUP_DIR') or os.path.join(os.path.dirname(DB_PATH), 'backups')
+BACKUP_INTERVAL = int(os.environ.get('BACKUP_INTERVAL', '86400'))  # 0이면 자동 백업 끔 (flask backup은 가능)
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', '7'))  # DB마다 남길 백업 수
+BACKUP_PAGES = int(os.environ.get('BACKUP_PAGES', '256'))
+BACKUP_SLEEP = float(os.environ.get('BACKUP_SLEEP', '0.05'))
+BACKUP_FILE = re.compile(r'^(?P<name>.+)-(?P<stamp>\d{8}-\d{6})\.db$')
+
+
+def backup_name(path):
+    """백업 파일 이름 앞부분 (questions, <학교>, <학교>.archive 등 DB 파일 이름에서 .db를 뺀 것)"""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def backup_targets(tenant=None):
+    """백업할 DB 경로 목록: 학교 DB와 (있으면) 보관 DB, 여러 학교 모드면 tenant 또는 모든 학교"""
+    if not TENANT_MODE:
+        paths = [DB_PATH]
+    else:
+        paths = [tenant_registry.path(n) for n in ([tenant] if tenant else tenant_registry.names())]
+    targets = []
+    for path in paths:
+        targets.append(path)
+        if os.path.exists(archive_path(path)):
+            targets.append(archive_path(path))
+    return targets
+
+
+def backup_source(name):
+    """백업 이름 → 복원할 DB 경로 (알 수 없는 이름이면 None)"""
+    base, archive = (name[:-len('.archive')], True) if name.endswith('.archive') else (name, False)
+    if not TENANT_MODE:
+        path = DB_PATH if base == backup_name(DB_PATH) else None
+    else:
+        path = tenant_registry.path(base) if tenant_registry.exists(base) else None
+    return archive_path(path) if path and archive else path
+
+
+def list_backups(name):
+    """name의 백업 파일 [(시각, 경로)], 최근 것부터"""
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    found = []
+    for filename in os.listdir(BACKUP_DIR):
+        match = BACKUP_FILE.match(filename)
+        if match and match['name'] == name:
+            found.append((datetime.strptime(match['stamp'], '%Y%m%d-%H%M%S'), os.path.join(BACKUP_DIR, filename)))
+    return sorted(found, reverse=True)
+
+
+def read_backup_status(name):
+    try:
+        with open(os.path.join(BACKUP_DIR, f'{name}.status.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def update_backup_status(name, **values):
+    """마지막 백업/체크포인트 결과를 BACKUP_DIR/<이름>.status.json에 기록 (어느 워커가 실행했든 관리자 API에서 보이도록)"""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    status = {**read_backup_status(name), **values}
+    path = os.path.join(BACKUP_DIR, f'{name}.status.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(status, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+
+
+def verify_backup(path):
+    """백업 파일을 읽기 전용으로 열어 PRAGMA integrity_check, 문제 목록을 돌려줌 (이상 없으면 빈 목록)"""
+    conn = sqlite3.connect(f'file:{pathname2url(os.path.abspath(path))}?mode=ro', uri=True)
+    try:
+        rows = [r[0] for r in conn.execute("PRAGMA integrity_check")]
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        conn.close()
+    return [] if rows == ['ok'] else rows
+
+
+def backup_database(path):
+    """path를 BACKUP_DIR/<이름>-<시각>.db로 백업하고 검사한 뒤, 오래된 백업을 지우고 결과를 돌려줌"""
+    name = backup_name(path)
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    target = os.path.join(BACKUP_DIR, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.db")
+    partial = target + '.partial'
+    steps = pages = 0
+
+    def progress(status, remaining, total):
+        # backup()의 sleep 인자는 잠금에 막혔을 때만 쉬므로 묶음 사이의 쉼은 여기서
+        nonlocal steps, pages
+        steps, pages = steps + 1, total
+        if remaining:
+            time.sleep(BACKUP_SLEEP)
+
+    started = time.perf_counter()
+    source = connect_db(path)
+    dest = sqlite3.connect(partial)
+    try:
+        # 읽기 트랜잭션 하나로 복사해 모든 단계가 같은 시점을 읽음 (WAL이라 쓰기를 막지 않고,
+        # 그 사이 다른 연결이 써도 처음부터 다시 복사하지 않음)
+        source.execute("BEGIN")
+        source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+        source.backup(dest, pages=BACKUP_PAGES, progress=progress)
+        source.rollback()
+        # 백업 파일은 -wal/-shm 없이 파일 하나로 (읽기 전용으로 열어 검사/복원할 수 있도록)
+        dest.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dest.close()
+        source.close()
+    copied = time.perf_counter()
+
+    problems = verify_backup(partial)
+    if problems:
+        os.remove(partial)
+        raise sqlite3.DatabaseError(f'백업 파일 검사 실패: {problems[0]}')
+    os.replace(partial, target)
+    finished = time.perf_counter()
+
+    for _, old in list_backups(name)[BACKUP_KEEP:]:
+        os.remove(old)
+    result = {
+        'file': os.path.basename(target),
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(finished - started, 3),
+        'copy_seconds': round(copied - started, 3),
+        'verify_seconds': round(finished - copied, 3),
+        'pages': pages,
+        'steps': steps,
+        'size': os.path.getsize(target),
+    }
+    update_backup_status(name, backup=result, error=None)
+    return result
+
+
+def checkpoint_database(path):
+    """PASSIVE 체크포인트 (읽는/쓰는 연결을 기다리지 않고 옮길 수 있는 만큼만 WAL을 DB 파일로 옮김)"""
+    started = time.perf_counter()
+    conn = connect_db(path)
+    try:
+        busy, wal_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    finally:
+        conn.close()
+    update_backup_status(backup_name(path), checkpoint={
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(time.perf_counter() - started, 4),
+        'busy': bool(busy),
+        'wal_pages': wal_pages,
+        'checkpointed_pages': checkpointed,
+    })
+
+
+class BackupScheduler:
+    """워커 프로세스마다 스레드 하나가 CHECKPOINT_INTERVAL마다 체크포인트, BACKUP_INTERVAL마다 백업
+
+    BACKUP_DIR/.lock을 flock으로 잡은 프로세스만 실행하고, 잡은 프로세스는 끝날 때까지 놓지 않는다.
+    백업 시각은 마지막 백업 파일 이름으로 정하므로 재시작해도 주기가 그대로다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._lock_file = None
+
+    def start(self):
+        if not (BACKUP_INTERVAL or CHECKPOINT_INTERVAL) or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # fork된 워커는 부모의 스레드와 잠금을 물려받지 않음
+            self._pid = os.getpid()
+            self._lock_file = None
+            threading.Thread(target=self._run, name='backup-scheduler', daemon=True).start()
+
+    def _acquire(self):
+        if self._lock_file is not None or fcntl is None:
+            return True
+        os.makedirs(BACKUP_DIR, exist_ok=True)
+        f = open(os.path.join(BACKUP_DIR, '.lock'), 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        return True
+
+    def _run(self):
+        pid = os.getpid()
+        tick = min(i for i in (BACKUP_INTERVAL, CHECKPOINT_INTERVAL, 60) if i > 0)
+        last_checkpoint = time.monotonic()
+        while self._pid == pid:
+            time.sleep(tick)
+            if not self._acquire():
+                continue
+            checkpoint = CHECKPOINT_INTERVAL and time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL
+            if checkpoint:
+                last_checkpoint = time.monotonic()
+            for path in backup_targets():
+                name = backup_name(path)
+                try:
+                    if checkpoint:
+                        checkpoint_database(path)
+                    backups = list_backups(name)
+                    if BACKUP_INTERVAL and (not backups or
+                                            (datetime.now() - backups[0][0]).total_seconds() >= BACKUP_INTERVAL):
+                        backup_database(path)
+                except Exception as e:
+                    app.logger.exception('%s 백업/체크포인트 실패', name)
+                    update_backup_status(name, error={
+                        'at': datetime.now().isoformat(timespec='seconds'), 'message': str(e)
+                    })
+
+
+backup_scheduler = BackupScheduler()
+
+
+@app.before_request
+def start_backup_scheduler():
+    backup_scheduler.start()
+
+
+# ── Static Assets ──
+
+# 정적 파일은 시작할 때 한 번 읽어 내용 해시와 미리 압축한 gzip/brotli 본문을 메모리에 둠
+STATIC_DIR = os.path.join(os.path.dirname(__file__), 'static')
+STATIC_MAX_AGE = 365 * 24 * 3600  # ?v=해시가 붙은 URL은 내용이 바뀌면 URL도 바뀌므로 1년 캐시
+GZIP_MIN_SIZE = int(os.environ.get('GZIP_MIN_SIZE', '1024'))  # 이보다 작은 JSON 응답은 압축하지 않음
+GZIP_LEVEL = 6
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+ASSET_URL = re.compile(r'(["\'])/static/([^"\'?#]+)\1')
+PAGE_LINK = re.compile(r'(href|src)="(/(?!/|static/)[^"]*)"')  # 학교 경로 아래에서 앞에 root를 붙일 페이지 링크
+
+
+class StaticAsset:
+    def __init__(self, body, mimetype, mtime):
+        self.mimetype = mimetype
+        self.mtime = mtime
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        self.bodies = {'identity': body}
+        if mimetype.startswith(COMPRESSIBLE_TYPES):
+            for encoding, compressed in (('br', brotli.compress(body) if brotli else None),
+                                         ('gzip', gzip.compress(body, compresslevel=9, mtime=0))):
+                if compressed is not None and len(compressed) < len(body):
+                    self.bodies[encoding] = compressed
+
+
+class StaticAssets:
+    """static/ 아래 파일의 지문(내용 해시)과 압축본, 그리고 에셋 URL에 ?v=해시를 붙인 HTML 페이지
+
+    빌드 단계 없이 처음 요청 때 만든다. 디버그 모드(app.run(debug=True))에서는 파일이 바뀌면 다시 만든다.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._assets = None
+        self._pages = {}  # (페이지, root) -> (원본 에셋, root를 넣은 에셋)
+
+    def _scan(self):
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                files[os.path.relpath(path, self.root).replace(os.sep, '/')] = os.stat(path).st_mtime_ns
+        return files
+
+    def _read(self, name):
+        with open(os.path.join(self.root, name), 'rb') as f:
+            return f.read()
+
+    def _build(self, files):
+        assets = {
+            name: StaticAsset(self._read(name), mimetypes.guess_type(name)[0] or 'application/octet-stream', mtime)
+            for name, mtime in files.items() if not name.endswith('.html')
+        }
+
+        def fingerprint(match):
+            quote, name = match.groups()
+            asset = assets.get(name)
+            return f'{quote}/static/{name}?v={asset.digest}{quote}' if asset else match.group(0)
+
+        # HTML은 에셋 URL을 바꾼 뒤에 해시를 계산 (에셋이 바뀌면 페이지 ETag도 바뀜)
+        # 실시간 업데이트가 켜져 있을 때만 JS가 /api/stream에 연결하도록 app-stream을 넣음
+        for name, mtime in files.items():
+            if name.endswith('.html'):
+                html = ASSET_URL.sub(fingerprint, self._read(name).decode('utf-8'))
+                if STREAM_ENABLED:
+                    html = html.replace('<head>', '<head>\n    <meta name="app-stream" content="1">', 1)
+                assets[name] = StaticAsset(html.encode('utf-8'), 'text/html', mtime)
+        return assets
+
+    def get(self, name):
+        with self._lock:
+            if self._assets is None:
+                self._assets = self._build(self._scan())
+            elif app.debug:
+                files = self._scan()
+                if files != {n: a.mtime for n, a in self._assets.items()}:
+                    self._assets = self._build(files)
+            return self._assets.get(name)
+
+    def page(self, name, root):
+        """HTML 페이지, /s/<학교> 경로 아래에서는 페이지 링크 앞에 root를 붙이고 JS가 읽을 app-root를 넣음"""
+        asset = self.get(name)
+        if not root or asset is None:
+            return asset
+        with self._lock:
+            source, page = self._pages.get((name, root), (None, None))
+            if source is not asset:
+                html = PAGE_LINK.sub(lambda m: f'{m.group(1)}="{root}{m.group(2)}"',
+                                     asset.bodies['identity'].decode('utf-8'))
+                html = html.replace('<head>', f'<head>\n    <meta name="app-root" content="{root}">', 1)
+                page = StaticAsset(html.encode('utf-8'), 'text/html', asset.mtime)
+                self._pages[(name, root)] = (asset, page)
+            return page
+
+
+static_assets = StaticAssets(STATIC_DIR)
+
+
+def asset_response(asset, immutable=False):
+    """클라이언트가 받는 인코딩 중 가장 작은 본문으로 응답 (ETag는 인코딩마다 다름)"""
+    accepted = request.accept_encodings
+    encoding = next((e for e in ('br', 'gzip') if e in asset.bodies and e in accepted), 'identity')
+    response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f'{asset.digest}-{encoding}')
+    if immutable:
+        response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+def page_response(name):
+    return asset_response(static_assets.page(name, request.script_root))
+
+
+@app.endpoint('static')
+def serve_static(filename):
+    # 지문 URL(?v=현재 해시)만 immutable, 해시 없이/예전 해시로 요청하면 매번 ETag로 재검증
+    asset = static_assets.get(filename)
+    if asset is None:
+        return send_from_directory(STATIC_DIR, filename)
+    return asset_response(asset, immutable=request.args.get('v') == asset.digest)
+
+
+@app.after_request
+def compress_json(response):
+    """GZIP_MIN_SIZE 이상인 JSON 응답을 gzip으로 압축 (SSE, CSV 같은 스트리밍 응답은 그대로)"""
+    if (response.mimetype != 'application/json' or response.status_code != 200
+            or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.accept_encodings or response.content_length < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(response.get_data(), compresslevel=GZIP_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    # 본문이 달라졌으므로 약한 ETag로 바꿈 (If-None-Match는 약한 비교라 304는 그대로 동작)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
 # ── Pages ──
 
 @app.route('/')
 def index():
-    return send_from_directory('static', 'index.html')
+    return page_response('index.html')
 
 
 @app.route('/admin')
 def admin_page():
-    return send_from_directory('static', 'admin.html')
+    return page_response('admin.html')
 
 
 @app.route('/hall')
 def hall_page():
-    return send_from_directory('static', 'hall.html')
+    return page_response('hall.html')
 
 
 # ── Auth API ──
@@ -196,61 +2154,58 @@ def login():
     if not student:
         # 신규 학생: 아직 등록되지 않음 → PIN 설정 필요
         if not pin:
-            conn.close()
             return jsonify({'need_pin_setup': True, 'message': '처음 오셨네요! 4자리 비밀번호를 설정해주세요.'}), 200
         if len(pin) != 4 or not pin.isdigit():
-            conn.close()
             return jsonify({'error': '비밀번호는 숫자 4자리로 설정해주세요'}), 400
         pin_hash = hashlib.sha256(pin.encode()).hexdigest()
-        conn.execute(
-            "INSERT INTO students (grade, class_num, student_num, name, pin, pin_hash) VALUES (?, ?, ?, ?, ?, ?)",
-            (grade, class_num, student_num, name, pin, pin_hash)
-        )
-        conn.commit()
+        with write_transaction(conn):
+            # 같은 학생의 첫 로그인이 동시에 들어오면 먼저 들어온 요청의 PIN으로 등록됨
+            conn.execute(
+                "INSERT INTO students (grade, class_num, student_num, name, pin, pin_hash) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (grade, class_num, student_num, name) DO NOTHING",
+                (grade, class_num, student_num, name, pin, pin_hash)
+            )
         student = conn.execute(
             "SELECT id, pin, pin_hash FROM students WHERE grade=? AND class_num=? AND student_num=? AND name=?",
             (grade, class_num, student_num, name)
         ).fetchone()
+        if student['pin_hash'] != pin_hash:
+            return jsonify({'error': '비밀번호가 올바르지 않습니다'}), 401
     else:
         # 기존 학생
         has_pin = student['pin'] is not None or student['pin_hash'] is not None
         if not has_pin:
             # PIN이 아직 없는 기존 학생 → PIN 설정 필요
             if not pin:
-                conn.close()
                 return jsonify({'need_pin_setup': True, 'message': '비밀번호가 아직 설정되지 않았어요. 4자리 비밀번호를 설정해주세요.'}), 200
             if len(pin) != 4 or not pin.isdigit():
-                conn.close()
                 return jsonify({'error': '비밀번호는 숫자 4자리로 설정해주세요'}), 400
             pin_hash = hashlib.sha256(pin.encode()).hexdigest()
-            conn.execute("UPDATE students SET pin = ?, pin_hash = ? WHERE id = ?", (pin, pin_hash, student['id']))
-            conn.commit()
+            with write_transaction(conn):
+                conn.execute("UPDATE students SET pin = ?, pin_hash = ? WHERE id = ?", (pin, pin_hash, student['id']))
         else:
             # PIN이 있는 기존 학생 → 비밀번호 확인
             if not pin:
-                conn.close()
                 return jsonify({'need_pin': True, 'message': '비밀번호를 입력해주세요.'}), 200
             # 평문 pin이 있으면 평문 비교, 없으면 해시 비교 (하위호환)
             if student['pin'] is not None:
                 if student['pin'] != pin:
-                    conn.close()
                     return jsonify({'error': '비밀번호가 올바르지 않습니다'}), 401
                 # 평문이 있으면 해시도 최신화
             else:
                 pin_hash = hashlib.sha256(pin.encode()).hexdigest()
                 if student['pin_hash'] != pin_hash:
-                    conn.close()
                     return jsonify({'error': '비밀번호가 올바르지 않습니다'}), 401
                 # 레거시: 해시만 있던 학생 → 평문도 저장
-                conn.execute("UPDATE students SET pin = ? WHERE id = ?", (pin, student['id']))
-                conn.commit()
+                with write_transaction(conn):
+                    conn.execute("UPDATE students SET pin = ? WHERE id = ?", (pin, student['id']))
 
+    start_tenant_session()
     session['student_id'] = student['id']
     session['student_grade'] = grade
     session['student_class'] = class_num
     session['student_num'] = student_num
     session['student_name'] = name
-    conn.close()
 
     return jsonify({
         'success': True,
@@ -272,7 +2227,7 @@ def logout():
 
 @app.route('/api/me')
 def me():
-    if 'student_id' not in session:
+    if 'student_id' not in session or not session_tenant_ok():
         return jsonify({'logged_in': False})
     return jsonify({
         'logged_in': True,
@@ -293,57 +2248,134 @@ def me():
 def get_questions():
     target_date = request.args.get('date', date.today().isoformat())
     sort = request.args.get('sort', 'latest')  # 'latest' or 'likes'
+    if sort != 'likes':
+        sort = 'latest'
+
+    # limit/cursor/grade/class_num 중 하나라도 있으면 키셋 페이지 조회, 없으면 하루치 전체(캐시)
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    grade = request.args.get('grade', type=int)
+    class_num = request.args.get('class_num', type=int)
+    paginated = limit is not None or cursor is not None or grade is not None or class_num is not None
 
     conn = get_db()
     student_id = session['student_id']
-
-    if sort == 'likes':
-        order = 'like_count DESC, q.created_at DESC'
+    today = date.today().isoformat()
+    questions_table, likes_table = feed_tables(conn, target_date)
+
+    # 버전이 그대로면 본문을 만들지 않고 304로 응답 (오늘 버전은 already_posted_today 때문에 포함)
+    version, today_version = get_feed_versions(conn, target_date, today)
+    pending_version = current_tenant().like_buffer.version(target_date) if LIKE_WRITE_BEHIND else 0
+    etag = hashlib.md5(
+        f'{student_id}:{sort}:{target_date}:{version}:{today}:{today_version}:'
+        f'{limit}:{cursor}:{grade}:{class_num}:{pending_version}'.encode()
+    ).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    # 본문보다 먼저 읽어야 그 사이의 변경을 /api/questions/changes에서 놓치지 않음 (중복 적용은 무해)
+    changes_cursor = latest_event_id(conn)
+
+    if paginated:
+        try:
+            after = decode_feed_cursor(cursor, sort)
+        except ValueError:
+            return jsonify({'error': '잘못된 커서입니다'}), 400
+        limit = max(1, min(limit or FEED_PAGE_MAX, FEED_PAGE_MAX))
+        rows, next_cursor = load_feed_page(conn, target_date, sort, after, limit, grade, class_num,
+                                           questions_table)
+        total_count = count_feed(conn, target_date, grade, class_num, questions_table)
     else:
-        order = 'q.created_at DESC'
-
-    questions = conn.execute(f'''
-        SELECT q.id, q.content, q.created_at, q.created_date,
-               s.grade, s.class_num, s.student_num, s.name,
-               COUNT(DISTINCT l.id) as like_count,
-               MAX(CASE WHEN l.student_id = ? THEN 1 ELSE 0 END) as liked_by_me
-        FROM questions q
-        JOIN students s ON q.student_id = s.id
-        LEFT JOIN likes l ON q.id = l.question_id
-        WHERE q.created_date = ? AND q.is_deleted = 0
-        GROUP BY q.id
-        ORDER BY {order}
-    ''', (student_id, target_date)).fetchall()
-
-    result = []
-    for q in questions:
-        result.append({
-            'id': q['id'],
-            'content': q['content'],
-            'created_at': q['created_at'],
-            'created_date': q['created_date'],
-            'author': f"{q['grade']}-{q['class_num']} {q['name']}",
-            'grade': q['grade'],
-            'class_num': q['class_num'],
-            'like_count': q['like_count'],
-            'liked_by_me': bool(q['liked_by_me']),
-            'is_mine': (q['student_num'] == session['student_num'] and
-                        q['grade'] == session['student_grade'] and
-                        q['class_num'] == session['student_class'])
-        })
+        feed_cache = current_tenant().feed_cache
+        rows = feed_cache.get((target_date, sort), version)
+        if rows is None:
+            rows = load_feed(conn, target_date, sort, questions_table)
+            feed_cache.put((target_date, sort), version, rows)
+        next_cursor = None
+        total_count = len(rows)
+
+    # 학생별 값(liked_by_me, is_mine)은 공용 스냅샷 위에 덧씌움
+    liked_ids = liked_question_ids(conn, student_id, [q['id'] for q, _ in rows], likes_table)
+    result = personalize_feed(conn, student_id, rows, liked_ids, archived=questions_table != 'questions')
 
     # Check if current student already posted today
     today_question = conn.execute(
         "SELECT id FROM questions WHERE student_id = ? AND created_date = ? AND is_deleted = 0",
-        (student_id, date.today().isoformat())
+        (student_id, today)
     ).fetchone()
 
-    conn.close()
-    return jsonify({
+    response = jsonify({
         'questions': result,
         'already_posted_today': today_question is not None,
         'date': target_date,
-        'total_count': len(result)
+        'total_count': total_count,
+        'next_cursor': next_cursor,
+        'changes_cursor': changes_cursor
+    })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+CHANGES_MAX = 500  # 이보다 많이 바뀌었으면 변경분 대신 전체를 다시 받게 함
+
+
+@app.route('/api/questions/changes', methods=['GET'])
+@login_required
+def get_question_changes():
+    """since(이벤트 id) 이후 추가/수정/삭제되었거나 좋아요 수가 바뀐 질문만 현재 상태로 돌려줌
+
+    이벤트가 정리되어 since 이후를 알 수 없거나 변경이 너무 많으면 reset=true (클라이언트는 전체를 다시 받음).
+    """
+    target_date = request.args.get('date', date.today().isoformat())
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({'error': '잘못된 커서입니다'}), 400
+
+    conn = get_db()
+    student_id = session['student_id']
+    head = latest_event_id(conn)
+    reset = {'reset': True, 'changes_cursor': head, 'date': target_date}
+    if since > head:
+        return jsonify(reset)
+    if since < head:
+        oldest = conn.execute("SELECT MIN(id) FROM events").fetchone()[0]
+        if oldest is None or oldest > since + 1:
+            return jsonify(reset)
+
+    events = conn.execute('''
+        SELECT json_extract(data, '$.id') as question_id FROM events
+        WHERE id > ? AND id <= ? AND kind IN ('question', 'like') AND json_extract(data, '$.date') = ?
+        LIMIT ?
+    ''', (since, head, target_date, CHANGES_MAX + 1)).fetchall()
+    if len(events) > CHANGES_MAX:
+        return jsonify(reset)
+    changed_ids = list(dict.fromkeys(r['question_id'] for r in events))
+
+    questions, deleted = [], []
+    if changed_ids:
+        rows = conn.execute('''
+            SELECT q.id, q.student_id, q.content, q.created_at, q.created_date, q.like_count, q.is_deleted,
+                   s.grade, s.class_num, s.name
+            FROM questions q
+            JOIN students s ON q.student_id = s.id
+            WHERE q.id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(changed_ids),)).fetchall()
+        deleted = [r['id'] for r in rows if r['is_deleted']]
+        liked_ids = liked_question_ids(conn, student_id, changed_ids)
+        questions = personalize_feed(
+            conn, student_id, [feed_row(r) for r in rows if not r['is_deleted']], liked_ids
+        )
+
+    return jsonify({
+        'reset': False,
+        'questions': questions,
+        'deleted': deleted,
+        'date': target_date,
+        'total_count': count_feed(conn, target_date),
+        'changes_cursor': head
     })
 
 
@@ -363,21 +2395,20 @@ def create_question():
 
     conn = get_db()
 
-    existing = conn.execute(
-        "SELECT id FROM questions WHERE student_id = ? AND created_date = ? AND is_deleted = 0",
-        (student_id, today)
-    ).fetchone()
+    with write_transaction(conn):
+        existing = conn.execute(
+            "SELECT id FROM questions WHERE student_id = ? AND created_date = ? AND is_deleted = 0",
+            (student_id, today)
+        ).fetchone()
 
-    if existing:
-        conn.close()
-        return jsonify({'error': '오늘은 이미 질문을 올렸어요! 내일 다시 도전해보세요'}), 400
+        if existing:
+            return jsonify({'error': '오늘은 이미 질문을 올렸어요! 내일 다시 도전해보세요'}), 400
 
-    conn.execute(
-        "INSERT INTO questions (student_id, content, created_date) VALUES (?, ?, ?)",
-        (student_id, content, today)
-    )
-    conn.commit()
-    conn.close()
+        cursor = conn.execute(
+            "INSERT INTO questions (student_id, content, created_date) VALUES (?, ?, ?)",
+            (student_id, content, today)
+        )
+        publish_event(conn, 'question', action='created', id=cursor.lastrowid, date=today)
 
     return jsonify({'success': True, 'message': '질문이 등록되었어요!'})
 
@@ -397,21 +2428,20 @@ def update_question(question_id):
         return jsonify({'error': '질문은 200자 이내로 작성해주세요'}), 400
 
     conn = get_db()
-    question = conn.execute(
-        "SELECT id, student_id FROM questions WHERE id = ? AND is_deleted = 0", (question_id,)
-    ).fetchone()
+    with write_transaction(conn):
+        question = conn.execute(
+            "SELECT id, student_id, created_date FROM questions WHERE id = ? AND is_deleted = 0", (question_id,)
+        ).fetchone()
 
-    if not question:
-        conn.close()
-        return jsonify({'error': '질문을 찾을 수 없습니다'}), 404
+        if question and question['student_id'] == student_id:
+            conn.execute("UPDATE questions SET content = ? WHERE id = ?", (content, question_id))
+            publish_event(conn, 'question', action='updated', id=question_id,
+                          date=question['created_date'], content=content)
 
+    if not question:
+        return missing_question_response(conn, [question_id])
     if question['student_id'] != student_id:
-        conn.close()
         return jsonify({'error': '본인의 질문만 수정할 수 있습니다'}), 403
-
-    conn.execute("UPDATE questions SET content = ? WHERE id = ?", (content, question_id))
-    conn.commit()
-    conn.close()
     return jsonify({'success': True, 'message': '질문이 수정되었어요!'})
 
 
@@ -421,21 +2451,19 @@ def delete_question(question_id):
     student_id = session['student_id']
     conn = get_db()
 
-    question = conn.execute(
-        "SELECT id, student_id FROM questions WHERE id = ? AND is_deleted = 0", (question_id,)
-    ).fetchone()
+    with write_transaction(conn):
+        question = conn.execute(
+            "SELECT id, student_id, created_date FROM questions WHERE id = ? AND is_deleted = 0", (question_id,)
+        ).fetchone()
 
-    if not question:
-        conn.close()
-        return jsonify({'error': '질문을 찾을 수 없습니다'}), 404
+        if question and question['student_id'] == student_id:
+            conn.execute("UPDATE questions SET is_deleted = 1 WHERE id = ?", (question_id,))
+            publish_event(conn, 'question', action='deleted', id=question_id, date=question['created_date'])
 
+    if not question:
+        return missing_question_response(conn, [question_id])
     if question['student_id'] != student_id:
-        conn.close()
         return jsonify({'error': '본인의 질문만 삭제할 수 있습니다'}), 403
-
-    conn.execute("UPDATE questions SET is_deleted = 1 WHERE id = ?", (question_id,))
-    conn.commit()
-    conn.close()
     return jsonify({'success': True, 'message': '질문이 삭제되었어요.'})
 
 
@@ -447,36 +2475,44 @@ def toggle_like(question_id):
     student_id = session['student_id']
     conn = get_db()
 
-    question = conn.execute(
-        "SELECT id, student_id FROM questions WHERE id = ? AND is_deleted = 0", (question_id,)
-    ).fetchone()
-
-    if not question:
-        conn.close()
-        return jsonify({'error': '질문을 찾을 수 없습니다'}), 404
-
-    existing = conn.execute(
-        "SELECT id FROM likes WHERE question_id = ? AND student_id = ?",
-        (question_id, student_id)
-    ).fetchone()
-
-    if existing:
-        conn.execute("DELETE FROM likes WHERE id = ?", (existing['id'],))
-        liked = False
-    else:
-        conn.execute(
-            "INSERT INTO likes (question_id, student_id) VALUES (?, ?)",
-            (question_id, student_id)
-        )
-        liked = True
+    if LIKE_WRITE_BEHIND:
+        question = conn.execute(
+            "SELECT id, created_date FROM questions WHERE id = ? AND is_deleted = 0", (question_id,)
+        ).fetchone()
+        if not question:
+            return missing_question_response(conn, [question_id])
+        liked, like_count = current_tenant().like_buffer.toggle(conn, question_id, question['created_date'], student_id)
+        return jsonify({'success': True, 'liked': liked, 'like_count': like_count})
+
+    with write_transaction(conn):
+        question = conn.execute(
+            "SELECT id, student_id, created_date FROM questions WHERE id = ? AND is_deleted = 0", (question_id,)
+        ).fetchone()
 
-    conn.commit()
+        if question:
+            existing = conn.execute(
+                "SELECT id FROM likes WHERE question_id = ? AND student_id = ?",
+                (question_id, student_id)
+            ).fetchone()
 
-    like_count = conn.execute(
-        "SELECT COUNT(*) as cnt FROM likes WHERE question_id = ?", (question_id,)
-    ).fetchone()['cnt']
+            if existing:
+                conn.execute("DELETE FROM likes WHERE id = ?", (existing['id'],))
+                liked = False
+            else:
+                conn.execute(
+                    "INSERT INTO likes (question_id, student_id) VALUES (?, ?)",
+                    (question_id, student_id)
+                )
+                liked = True
+
+            # trg_likes_* 트리거가 같은 트랜잭션에서 갱신한 값
+            like_count = conn.execute(
+                "SELECT like_count FROM questions WHERE id = ?", (question_id,)
+            ).fetchone()['like_count']
+            publish_event(conn, 'like', id=question_id, date=question['created_date'], like_count=like_count)
 
-    conn.close()
+    if not question:
+        return missing_question_response(conn, [question_id])
     return jsonify({'success': True, 'liked': liked, 'like_count': like_count})
 
 
@@ -487,19 +2523,79 @@ def toggle_like(question_id):
 def get_dates():
     conn = get_db()
     dates = conn.execute('''
-        SELECT DISTINCT created_date, COUNT(*) as question_count
-        FROM questions WHERE is_deleted = 0
-        GROUP BY created_date
+        SELECT created_date, question_count
+        FROM daily_stats WHERE question_count > 0
         ORDER BY created_date DESC
         LIMIT 30
     ''').fetchall()
-    conn.close()
 
     return jsonify({
         'dates': [{'date': d['created_date'], 'count': d['question_count']} for d in dates]
     })
 
 
+# ── Live Stream API ──
+
+@app.route('/api/stream')
+@login_required
+def stream():
+    """질문/좋아요/주제 변경을 Server-Sent Events로 전달 (클라이언트는 끊기면 폴링으로 대체)"""
+    if not STREAM_ENABLED:
+        return jsonify({'error': '실시간 업데이트가 꺼져 있습니다'}), 404
+
+    # 구독을 먼저 걸고 밀린 이벤트를 읽어야 그 사이의 이벤트를 놓치지 않음 (중복은 id로 거름)
+    tenant = current_tenant()
+    event_broker = tenant.event_broker
+    q = event_broker.subscribe()
+    conn = get_db()
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        backlog = []
+    else:
+        backlog = [(r['id'], r['kind'], r['data']) for r in conn.execute(
+            "SELECT id, kind, data FROM events WHERE id > ? ORDER BY id LIMIT 500", (last_event_id,)
+        )]
+
+    def generate():
+        last_sent = last_event_id
+        yield 'retry: 3000\n\n'
+        for event_id, kind, data in backlog:
+            last_sent = event_id
+            yield format_sse(event_id, kind, data)
+
+        # 워커를 오래 붙잡지 않도록 일정 시간 후 종료 (EventSource가 Last-Event-ID로 자동 재접속)
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        while event_broker.is_subscribed(q):
+            # 하트비트 간격을 다 기다리지 않고 마감 시각에 맞춰 끝냄
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event_id, kind, data = q.get(timeout=min(STREAM_HEARTBEAT, remaining))
+            except queue.Empty:
+                yield ': ping\n\n'
+                continue
+            if event_id <= last_sent:
+                continue
+            last_sent = event_id
+            yield format_sse(event_id, kind, data)
+
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # 스트림이 열려 있는 동안은 학교 DB를 닫지 않음 (요청 teardown 뒤에도 계속 보냄)
+    tenant_registry.retain(tenant)
+
+    def close_stream():
+        event_broker.unsubscribe(q)
+        tenant_registry.release(tenant)
+
+    response.call_on_close(close_stream)
+    return response
+
+
 # ── Admin API ──
 
 @app.route('/api/admin/login', methods=['POST'])
@@ -517,11 +2613,11 @@ def admin_login():
         "SELECT id, username FROM admins WHERE username = ? AND password_hash = ?",
         (username, pw_hash)
     ).fetchone()
-    conn.close()
 
     if not admin:
         return jsonify({'error': '아이디 또는 비밀번호가 올바르지 않습니다'}), 401
 
+    start_tenant_session()
     session['admin_id'] = admin['id']
     session['admin_username'] = admin['username']
     return jsonify({'success': True, 'username': admin['username']})
@@ -536,7 +2632,7 @@ def admin_logout():
 
 @app.route('/api/admin/me')
 def admin_me():
-    if 'admin_id' not in session:
+    if 'admin_id' not in session or not session_tenant_ok():
         return jsonify({'logged_in': False})
     return jsonify({'logged_in': True, 'username': session['admin_username']})
 
@@ -546,20 +2642,17 @@ def admin_me():
 def admin_get_questions():
     target_date = request.args.get('date', date.today().isoformat())
     conn = get_db()
+    questions_table, _ = feed_tables(conn, target_date)
 
-    questions = conn.execute('''
-        SELECT q.id, q.content, q.created_at, q.created_date, q.is_deleted,
-               s.grade, s.class_num, s.student_num, s.name,
-               COUNT(DISTINCT l.id) as like_count
-        FROM questions q
+    questions = conn.execute(f'''
+        SELECT q.id, q.content, q.created_at, q.created_date, q.is_deleted, q.like_count,
+               s.grade, s.class_num, s.student_num, s.name
+        FROM {questions_table} q
         JOIN students s ON q.student_id = s.id
-        LEFT JOIN likes l ON q.id = l.question_id
         WHERE q.created_date = ?
-        GROUP BY q.id
         ORDER BY q.created_at DESC
     ''', (target_date,)).fetchall()
 
-    conn.close()
     return jsonify({
         'questions': [{
             'id': q['id'],
@@ -567,7 +2660,8 @@ def admin_get_questions():
             'created_at': q['created_at'],
             'author': f"{q['grade']}-{q['class_num']} {q['name']} ({q['student_num']}번)",
             'like_count': q['like_count'],
-            'is_deleted': bool(q['is_deleted'])
+            'is_deleted': bool(q['is_deleted']),
+            'archived': questions_table != 'questions'
         } for q in questions],
         'date': target_date
     })
@@ -577,9 +2671,12 @@ def admin_get_questions():
 @admin_required
 def admin_delete_question(question_id):
     conn = get_db()
-    conn.execute("UPDATE questions SET is_deleted = 1 WHERE id = ?", (question_id,))
-    conn.commit()
-    conn.close()
+    with write_transaction(conn):
+        updated = conn.execute("UPDATE questions SET is_deleted = 1 WHERE id = ?", (question_id,)).rowcount
+        if updated:
+            publish_question_events(conn, 'deleted', [question_id])
+    if not updated:
+        return missing_question_response(conn, [question_id])
     return jsonify({'success': True})
 
 
@@ -587,9 +2684,12 @@ def admin_delete_question(question_id):
 @admin_required
 def admin_restore_question(question_id):
     conn = get_db()
-    conn.execute("UPDATE questions SET is_deleted = 0 WHERE id = ?", (question_id,))
-    conn.commit()
-    conn.close()
+    with write_transaction(conn):
+        updated = conn.execute("UPDATE questions SET is_deleted = 0 WHERE id = ?", (question_id,)).rowcount
+        if updated:
+            publish_question_events(conn, 'restored', [question_id])
+    if not updated:
+        return missing_question_response(conn, [question_id])
     return jsonify({'success': True})
 
 
@@ -603,9 +2703,14 @@ def admin_bulk_delete_questions():
 
     conn = get_db()
     placeholders = ','.join(['?' for _ in ids])
-    conn.execute(f"UPDATE questions SET is_deleted = 1 WHERE id IN ({placeholders})", ids)
-    conn.commit()
-    conn.close()
+    with write_transaction(conn):
+        # 하나라도 없는(보관된) 질문이 섞여 있으면 아무것도 바꾸지 않음
+        missing = missing_question_ids(conn, ids)
+        if not missing:
+            conn.execute(f"UPDATE questions SET is_deleted = 1 WHERE id IN ({placeholders})", ids)
+            publish_question_events(conn, 'deleted', ids)
+    if missing:
+        return missing_question_response(conn, missing)
     return jsonify({'success': True, 'message': f'{len(ids)}개의 질문이 삭제되었습니다.'})
 
 
@@ -619,9 +2724,14 @@ def admin_bulk_restore_questions():
 
     conn = get_db()
     placeholders = ','.join(['?' for _ in ids])
-    conn.execute(f"UPDATE questions SET is_deleted = 0 WHERE id IN ({placeholders})", ids)
-    conn.commit()
-    conn.close()
+    with write_transaction(conn):
+        # 하나라도 없는(보관된) 질문이 섞여 있으면 아무것도 바꾸지 않음
+        missing = missing_question_ids(conn, ids)
+        if not missing:
+            conn.execute(f"UPDATE questions SET is_deleted = 0 WHERE id IN ({placeholders})", ids)
+            publish_question_events(conn, 'restored', ids)
+    if missing:
+        return missing_question_response(conn, missing)
     return jsonify({'success': True, 'message': f'{len(ids)}개의 질문이 복원되었습니다.'})
 
 
@@ -630,66 +2740,63 @@ def admin_bulk_restore_questions():
 def admin_stats():
     conn = get_db()
 
-    # Total stats
-    total_students = conn.execute("SELECT COUNT(*) as cnt FROM students").fetchone()['cnt']
-    total_questions = conn.execute(
-        "SELECT COUNT(*) as cnt FROM questions WHERE is_deleted = 0"
-    ).fetchone()['cnt']
-    total_likes = conn.execute("SELECT COUNT(*) as cnt FROM likes").fetchone()['cnt']
+    # Total stats (학생 수는 grade_student_stats, 질문/좋아요 수는 daily_stats 집계 테이블에서)
+    student_counts = conn.execute(
+        "SELECT grade, student_count as cnt FROM grade_student_stats WHERE student_count > 0 ORDER BY grade"
+    ).fetchall()
+    total_students = sum(r['cnt'] for r in student_counts)
+    totals = conn.execute('''
+        SELECT COALESCE(SUM(question_count), 0) as questions, COALESCE(SUM(like_count), 0) as likes
+        FROM daily_stats
+    ''').fetchone()
+    total_questions = totals['questions']
+    total_likes = totals['likes']
 
     today = date.today().isoformat()
-    today_questions = conn.execute(
-        "SELECT COUNT(*) as cnt FROM questions WHERE created_date = ? AND is_deleted = 0",
-        (today,)
-    ).fetchone()['cnt']
+    today_row = conn.execute(
+        "SELECT question_count FROM daily_stats WHERE created_date = ?", (today,)
+    ).fetchone()
+    today_questions = today_row['question_count'] if today_row else 0
 
     # Daily question counts (last 14 days)
     daily_stats = conn.execute('''
-        SELECT created_date, COUNT(*) as cnt
-        FROM questions WHERE is_deleted = 0
-        GROUP BY created_date
+        SELECT created_date, question_count as cnt
+        FROM daily_stats WHERE question_count > 0
         ORDER BY created_date DESC
         LIMIT 14
     ''').fetchall()
 
     # Grade participation stats
-    grade_stats = conn.execute('''
-        SELECT s.grade,
-               COUNT(DISTINCT s.id) as student_count,
-               COUNT(DISTINCT q.id) as question_count
-        FROM students s
-        LEFT JOIN questions q ON s.id = q.student_id AND q.is_deleted = 0
-        GROUP BY s.grade
-        ORDER BY s.grade
-    ''').fetchall()
-
-    # Top questions by likes (since hall reset)
+    grade_questions = {r['grade']: r['cnt'] for r in conn.execute(
+        "SELECT grade, SUM(question_count) as cnt FROM grade_daily_stats GROUP BY grade"
+    )}
+    grade_stats = [{
+        'grade': r['grade'],
+        'student_count': r['cnt'],
+        'question_count': grade_questions.get(r['grade'], 0)
+    } for r in student_counts]
+
+    # Top questions by likes (since hall reset, 보관은 보통 초기화 날짜 이전만 옮기지만 기간이 걸치면 보관 DB도 함께)
     hall_reset_date = get_setting(conn, 'hall_reset_date', '2000-01-01')
-    top_questions = conn.execute('''
-        SELECT q.content, s.grade, s.class_num, s.name,
-               COUNT(l.id) as like_count
-        FROM questions q
-        JOIN students s ON q.student_id = s.id
-        LEFT JOIN likes l ON q.id = l.question_id
-        WHERE q.is_deleted = 0 AND q.created_date >= ?
-        GROUP BY q.id
-        HAVING like_count > 0
+    parts = range_tables(conn, hall_reset_date, today)
+    top_questions = conn.execute(f'''
+        SELECT * FROM ({' UNION ALL '.join(f"""
+            SELECT q.content, q.like_count, s.grade, s.class_num, s.name
+            FROM {table} q
+            JOIN students s ON q.student_id = s.id
+            WHERE q.is_deleted = 0 AND q.created_date >= ? AND q.created_date <= ? AND q.like_count > 0
+        """ for table, _, _ in parts)})
         ORDER BY like_count DESC
         LIMIT 10
-    ''', (hall_reset_date,)).fetchall()
+    ''', [d for _, start, end in parts for d in (start, end)]).fetchall()
 
-    conn.close()
     return jsonify({
         'total_students': total_students,
         'total_questions': total_questions,
         'total_likes': total_likes,
         'today_questions': today_questions,
         'daily_stats': [{'date': d['created_date'], 'count': d['cnt']} for d in daily_stats],
-        'grade_stats': [{
-            'grade': g['grade'],
-            'student_count': g['student_count'],
-            'question_count': g['question_count']
-        } for g in grade_stats],
+        'grade_stats': grade_stats,
         'top_questions': [{
             'content': q['content'],
             'author': f"{q['grade']}-{q['class_num']} {q['name']}",
@@ -698,19 +2805,102 @@ def admin_stats():
     })
 
 
+def rebuild_student_stats(conn):
+    """grade_student_stats를 students 테이블에서 다시 계산 (커밋은 호출한 쪽에서)"""
+    conn.execute("DELETE FROM grade_student_stats")
+    conn.execute('''
+        INSERT INTO grade_student_stats (grade, student_count)
+        SELECT grade, COUNT(*) FROM students GROUP BY grade
+    ''')
+
+
+def rebuild_daily_stats(conn):
+    """daily_stats, grade_daily_stats를 questions/likes 테이블에서 처음부터 다시 계산 (커밋은 호출한 쪽에서)
+
+    보관 DB로 옮긴 날짜(archive_before 이전)의 집계는 그대로 둔다.
+    """
+    since = get_setting(conn, ARCHIVE_BEFORE_KEY, '')
+    conn.execute("DELETE FROM daily_stats WHERE created_date >= ?", (since,))
+    conn.execute("DELETE FROM grade_daily_stats WHERE created_date >= ?", (since,))
+    conn.execute('''
+        INSERT INTO daily_stats (created_date, question_count, like_count)
+        SELECT created_date,
+               SUM(CASE WHEN is_deleted = 0 THEN 1 ELSE 0 END),
+               SUM(like_count)
+        FROM questions
+        WHERE created_date >= ?
+        GROUP BY created_date
+    ''', (since,))
+    conn.execute('''
+        INSERT INTO grade_daily_stats (created_date, grade, question_count)
+        SELECT q.created_date, s.grade, COUNT(*)
+        FROM questions q
+        JOIN students s ON q.student_id = s.id
+        WHERE q.is_deleted = 0 AND q.created_date >= ?
+        GROUP BY q.created_date, s.grade
+    ''', (since,))
+
+
+@app.route('/api/admin/db-pool')
+@admin_required
+def admin_db_pool():
+    # 워커 프로세스별 값 (hits: 재사용, misses: 새 연결 생성, waits: 풀이 가득 차 대기한 횟수)
+    return jsonify({'pid': os.getpid(), **current_tenant().pool.stats()})
+
+
+@app.route('/api/admin/backups')
+@admin_required
+def admin_backups():
+    """이 학교 DB(와 보관 DB)의 백업 목록과 마지막 백업/체크포인트에 걸린 시간"""
+    paths = [current_tenant().path]
+    if os.path.exists(archive_path()):
+        paths.append(archive_path())
+    databases = []
+    for path in paths:
+        name = backup_name(path)
+        status = read_backup_status(name)
+        databases.append({
+            'name': name,
+            'last_backup': status.get('backup'),
+            'last_checkpoint': status.get('checkpoint'),
+            'last_error': status.get('error'),
+            'backups': [{
+                'file': os.path.basename(backup),
+                'created_at': created.isoformat(timespec='seconds'),
+                'size': os.path.getsize(backup)
+            } for created, backup in list_backups(name)]
+        })
+    return jsonify({
+        'interval_seconds': BACKUP_INTERVAL,
+        'keep': BACKUP_KEEP,
+        'checkpoint_interval_seconds': CHECKPOINT_INTERVAL,
+        'databases': databases
+    })
+
+
+@app.route('/api/admin/metrics')
+def admin_metrics():
+    # 관리자 세션 또는 METRICS_TOKEN(Bearer)으로 접근, 값은 응답한 워커 프로세스 기준
+    token = request.headers.get('Authorization', '')
+    authorized = ('admin_id' in session and session_tenant_ok()) or (
+        METRICS_TOKEN and secrets.compare_digest(token, f'Bearer {METRICS_TOKEN}')
+    )
+    if not authorized:
+        return jsonify({'error': '관리자 로그인이 필요합니다'}), 401
+    return Response(metrics.render(current_tenant().pool.stats()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ── Admin PIN Reset ──
 
 @app.route('/api/admin/reset-pin/<int:student_id>', methods=['POST'])
 @admin_required
 def admin_reset_pin(student_id):
     conn = get_db()
-    student = conn.execute("SELECT id, grade, class_num, student_num, name FROM students WHERE id = ?", (student_id,)).fetchone()
-    if not student:
-        conn.close()
-        return jsonify({'error': '학생을 찾을 수 없습니다'}), 404
-    conn.execute("UPDATE students SET pin = NULL, pin_hash = NULL WHERE id = ?", (student_id,))
-    conn.commit()
-    conn.close()
+    with write_transaction(conn):
+        student = conn.execute("SELECT id, grade, class_num, student_num, name FROM students WHERE id = ?", (student_id,)).fetchone()
+        if not student:
+            return jsonify({'error': '학생을 찾을 수 없습니다'}), 404
+        conn.execute("UPDATE students SET pin = NULL, pin_hash = NULL WHERE id = ?", (student_id,))
     return jsonify({'success': True, 'message': f"{student['grade']}-{student['class_num']} {student['name']} 학생의 비밀번호가 초기화되었습니다."})
 
 
@@ -725,31 +2915,32 @@ def admin_generate_pins():
 
     conn = get_db()
 
-    if target == 'no_pin':
-        students = conn.execute(
-            "SELECT id, grade, class_num, student_num, name FROM students WHERE pin IS NULL AND pin_hash IS NULL"
-        ).fetchall()
-    else:
-        students = conn.execute(
-            "SELECT id, grade, class_num, student_num, name FROM students"
-        ).fetchall()
-
-    results = []
-    for s in students:
-        new_pin = str(random.randint(1000, 9999))
-        new_pin_hash = hashlib.sha256(new_pin.encode()).hexdigest()
-        conn.execute("UPDATE students SET pin = ?, pin_hash = ? WHERE id = ?", (new_pin, new_pin_hash, s['id']))
-        results.append({
-            'id': s['id'],
-            'grade': s['grade'],
-            'class_num': s['class_num'],
-            'student_num': s['student_num'],
-            'name': s['name'],
-            'pin': new_pin
-        })
-
-    conn.commit()
-    conn.close()
+    # 대상 조회와 UPDATE 사이에 다른 요청이 끼어들지 않도록 한 트랜잭션으로 묶음
+    with write_transaction(conn):
+        if target == 'no_pin':
+            students = conn.execute(
+                "SELECT id, grade, class_num, student_num, name FROM students WHERE pin IS NULL AND pin_hash IS NULL"
+            ).fetchall()
+        else:
+            students = conn.execute(
+                "SELECT id, grade, class_num, student_num, name FROM students"
+            ).fetchall()
+
+        results = []
+        updates = []
+        for s in students:
+            new_pin = str(random.randint(1000, 9999))
+            updates.append((new_pin, hashlib.sha256(new_pin.encode()).hexdigest(), s['id']))
+            results.append({
+                'id': s['id'],
+                'grade': s['grade'],
+                'class_num': s['class_num'],
+                'student_num': s['student_num'],
+                'name': s['name'],
+                'pin': new_pin
+            })
+
+        conn.executemany("UPDATE students SET pin = ?, pin_hash = ? WHERE id = ?", updates)
 
     return jsonify({
         'success': True,
@@ -776,15 +2967,18 @@ def admin_set_pins():
     conn = get_db()
     pin_hash = hashlib.sha256(custom_pin.encode()).hexdigest()
 
-    updated = 0
-    for sid in student_ids:
-        student = conn.execute("SELECT id FROM students WHERE id = ?", (sid,)).fetchone()
-        if student:
-            conn.execute("UPDATE students SET pin = ?, pin_hash = ? WHERE id = ?", (custom_pin, pin_hash, sid))
-            updated += 1
-
-    conn.commit()
-    conn.close()
+    # 목록을 JSON 하나로 넘겨 존재 확인과 UPDATE를 각각 한 번에 처리
+    # (IN (?, ?, ...)는 수만 명이면 바인딩 변수 한도를 넘음, 중복 id는 예전처럼 따로 셈)
+    ids_json = json.dumps(student_ids)
+    with write_transaction(conn):
+        updated = conn.execute(
+            "SELECT COUNT(*) FROM json_each(?) j WHERE EXISTS (SELECT 1 FROM students WHERE id = j.value)",
+            (ids_json,)
+        ).fetchone()[0]
+        conn.execute(
+            "UPDATE students SET pin = ?, pin_hash = ? WHERE id IN (SELECT value FROM json_each(?))",
+            (custom_pin, pin_hash, ids_json)
+        )
 
     return jsonify({
         'success': True,
@@ -803,7 +2997,6 @@ def admin_get_students():
         FROM students
         ORDER BY grade, class_num, student_num
     ''').fetchall()
-    conn.close()
     return jsonify({
         'students': [{
             'id': s['id'],
@@ -826,9 +3019,11 @@ def admin_get_students():
 def reset_hall():
     conn = get_db()
     today = date.today().isoformat()
-    set_setting(conn, 'hall_reset_date', today)
-    conn.commit()
-    conn.close()
+    with write_transaction(conn):
+        set_setting(conn, 'hall_reset_date', today)
+        rebuild_hall_scores(conn)
+        publish_event(conn, 'hall', action='reset', date=today)
+    current_tenant().settings_cache.invalidate()
     return jsonify({'success': True, 'message': f'명예의 전당이 초기화되었습니다. ({today}부터 새로 집계됩니다.)'})
 
 
@@ -839,7 +3034,6 @@ def reset_hall():
 def get_topic():
     conn = get_db()
     topic = get_setting(conn, 'current_topic', '자연')
-    conn.close()
     return jsonify({'topic': topic})
 
 
@@ -848,7 +3042,6 @@ def get_topic():
 def admin_get_topic():
     conn = get_db()
     topic = get_setting(conn, 'current_topic', '자연')
-    conn.close()
     return jsonify({'topic': topic})
 
 
@@ -862,142 +3055,915 @@ def admin_set_topic():
     if len(topic) > 50:
         return jsonify({'error': '주제는 50자 이내로 입력해주세요'}), 400
     conn = get_db()
-    set_setting(conn, 'current_topic', topic)
-    conn.commit()
-    conn.close()
+    with write_transaction(conn):
+        set_setting(conn, 'current_topic', topic)
+        publish_event(conn, 'topic', topic=topic)
+    current_tenant().settings_cache.invalidate()
     return jsonify({'success': True, 'topic': topic, 'message': f'주제가 "{topic}"(으)로 설정되었습니다.'})
 
 
 # ── Hall of Fame API ──
 
+def rebuild_hall_scores(conn):
+    """hall_reset_date 이후 질문으로 hall_scores를 처음부터 다시 계산 (커밋은 호출한 쪽에서)"""
+    hall_reset_date = get_setting(conn, 'hall_reset_date', '2000-01-01')
+    conn.execute("DELETE FROM hall_scores")
+    conn.execute('''
+        INSERT INTO hall_scores (student_id, grade, class_num, student_num, question_count)
+        SELECT s.id, s.grade, s.class_num, s.student_num, COUNT(q.id)
+        FROM students s
+        JOIN questions q ON s.id = q.student_id AND q.is_deleted = 0
+                        AND q.created_date >= ?
+        GROUP BY s.id
+    ''', (hall_reset_date,))
+
+
 @app.route('/api/hall-of-fame')
 @login_required
 def hall_of_fame():
     student_id = session['student_id']
+    limit = request.args.get('limit', type=int)  # 없으면 전체 순위
     conn = get_db()
 
-    hall_reset_date = get_setting(conn, 'hall_reset_date', '2000-01-01')
-
     ranking = conn.execute('''
-        SELECT s.id, s.grade, s.class_num, s.student_num, s.name,
-               COUNT(q.id) as question_count
-        FROM students s
-        JOIN questions q ON s.id = q.student_id AND q.is_deleted = 0
-                        AND q.created_date >= ?
-        GROUP BY s.id
-        ORDER BY question_count DESC, s.grade ASC, s.class_num ASC, s.student_num ASC
-    ''', (hall_reset_date,)).fetchall()
-
-    # 공동 순위 계산
+        SELECT h.student_id, h.grade, h.class_num, h.question_count, s.name
+        FROM hall_scores h
+        JOIN students s ON s.id = h.student_id
+        ORDER BY h.question_count DESC, h.grade ASC, h.class_num ASC, h.student_num ASC
+        LIMIT ?
+    ''', (limit if limit and limit > 0 else -1,)).fetchall()
+
+    # 공동 순위 계산 (정렬된 앞부분만 읽어도 순위는 전체 기준과 같음)
     result = []
     rank = 1
     for i, r in enumerate(ranking):
         if i > 0 and r['question_count'] < ranking[i - 1]['question_count']:
             rank = i + 1
         result.append({
-            'id': r['id'],
+            'id': r['student_id'],
             'grade': r['grade'],
             'class_num': r['class_num'],
             'name': r['name'],
             'question_count': r['question_count'],
-            'is_me': r['id'] == student_id,
+            'is_me': r['student_id'] == student_id,
             'rank': rank
         })
 
-    conn.close()
-    return jsonify({'ranking': result})
+    # 내 순위 = 나보다 질문이 많은 학생 수 + 1 (question_count 인덱스 범위만 셈)
+    my_rank = None
+    mine = conn.execute(
+        "SELECT question_count FROM hall_scores WHERE student_id = ?", (student_id,)
+    ).fetchone()
+    if mine:
+        higher = conn.execute(
+            "SELECT COUNT(*) as cnt FROM hall_scores WHERE question_count > ?", (mine['question_count'],)
+        ).fetchone()['cnt']
+        my_rank = {'rank': higher + 1, 'question_count': mine['question_count']}
 
+    total_count = conn.execute("SELECT COUNT(*) as cnt FROM hall_scores").fetchone()['cnt']
 
-# ── Excel Export API ──
+    return jsonify({'ranking': result, 'me': my_rank, 'total_count': total_count})
 
-@app.route('/api/admin/export/questions')
+
+# ── Search API ──
+
+SEARCH_PAGE_MAX = 50
+FTS_MIN_TERM = 3  # trigram 색인은 3글자 이상인 검색어만 찾을 수 있음
+
+
+def rebuild_search_index(conn):
+    """questions_fts 색인을 삭제되지 않은 질문으로 다시 채움 (커밋은 호출한 쪽에서)"""
+    conn.execute("INSERT INTO questions_fts (questions_fts) VALUES ('delete-all')")
+    conn.execute("INSERT INTO questions_fts (rowid, content) SELECT id, content FROM questions WHERE is_deleted = 0")
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def has_search_index(conn):
+    tenant = current_tenant()
+    if tenant.search_fts is None:
+        tenant.search_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'questions_fts'"
+        ).fetchone() is not None
+    return tenant.search_fts
+
+
+def search_questions(conn, query, limit, offset):
+    """검색어의 모든 단어를 포함하는 질문을 bm25 순으로 (3글자 미만 단어만 있으면 최신순 LIKE 검색)
+
+    보관 DB가 있으면 보관된 질문도 같은 기준으로 섞어서 정렬한다 (bm25 점수는 DB마다의 색인 통계로 계산되므로
+    두 DB 사이의 순서는 근사치).
+    """
+    terms = query.split()
+    long_terms = [t for t in terms if len(t) >= FTS_MIN_TERM] if has_search_index(conn) else []
+    short_terms = [t for t in terms if t not in long_terms]
+
+    like_sql = ''.join(" AND q.content LIKE ? ESCAPE '\\'" for _ in short_terms)
+    like_params = [f'%{escape_like(t)}%' for t in short_terms]
+    match = ' AND '.join('"' + t.replace('"', '""') + '"' for t in long_terms)
+
+    schemas = ['']
+    if get_setting(conn, ARCHIVE_BEFORE_KEY) and attach_archive(conn):
+        schemas.append(f'{ARCHIVE_SCHEMA}.')
+
+    parts, params = [], []
+    for schema in schemas:
+        if long_terms:
+            parts.append(f'''
+                SELECT q.id, q.content, q.created_date, q.created_at, q.like_count,
+                       s.grade, s.class_num, s.student_num, s.name,
+                       bm25(questions_fts) AS rank
+                FROM {schema}questions_fts
+                JOIN {schema}questions q ON q.id = questions_fts.rowid
+                JOIN students s ON q.student_id = s.id
+                WHERE questions_fts MATCH ? AND q.is_deleted = 0{like_sql}
+            ''')
+            params += [match, *like_params]
+        else:
+            parts.append(f'''
+                SELECT q.id, q.content, q.created_date, q.created_at, q.like_count,
+                       s.grade, s.class_num, s.student_num, s.name,
+                       0 AS rank
+                FROM {schema}questions q
+                JOIN students s ON q.student_id = s.id
+                WHERE q.is_deleted = 0{like_sql}
+            ''')
+            params += like_params
+
+    # 학교 DB만 있을 때는 서브쿼리가 펼쳐져 한 테이블 쿼리와 같은 실행 계획 (LIKE 검색은 id 역순으로 읽으며 LIMIT)
+    order = ('rank, ' if long_terms else '') + 'id DESC'
+    return conn.execute(f'''
+        SELECT * FROM ({' UNION ALL '.join(parts)})
+        ORDER BY {order}
+        LIMIT ? OFFSET ?
+    ''', [*params, limit, offset]).fetchall()
+
+
+@app.route('/api/admin/search')
 @admin_required
-def export_questions():
-    start_date = request.args.get('start', '2020-01-01')
-    end_date = request.args.get('end', date.today().isoformat())
+def admin_search():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': '검색어를 입력해주세요'}), 400
+    if len(query) > 100:
+        return jsonify({'error': '검색어는 100자 이내로 입력해주세요'}), 400
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    limit = max(1, min(request.args.get('limit', 20, type=int), SEARCH_PAGE_MAX))
 
     conn = get_db()
-    questions = conn.execute('''
-        SELECT q.id, q.content, q.created_date, q.created_at,
-               s.grade, s.class_num, s.student_num, s.name,
-               COUNT(DISTINCT l.id) as like_count
-        FROM questions q
-        JOIN students s ON q.student_id = s.id
-        LEFT JOIN likes l ON q.id = l.question_id
-        WHERE q.created_date >= ? AND q.created_date <= ? AND q.is_deleted = 0
-        GROUP BY q.id
-        ORDER BY q.created_date DESC, q.created_at DESC
-    ''', (start_date, end_date)).fetchall()
-    conn.close()
+    rows = search_questions(conn, query, limit + 1, (page - 1) * limit)
+
+    return jsonify({
+        'results': [{
+            'id': q['id'],
+            'content': q['content'],
+            'created_date': q['created_date'],
+            'created_at': q['created_at'],
+            'author': f"{q['grade']}-{q['class_num']} {q['name']} ({q['student_num']}번)",
+            'like_count': q['like_count']
+        } for q in rows[:limit]],
+        'query': query,
+        'page': page,
+        'has_more': len(rows) > limit
+    })
+
+
+# ── Roster Import API ──
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_ERRORS = 20
+
+# 엑셀 다운로드(학생별 통계)와 같은 한글 헤더 또는 영문 컬럼명
+IMPORT_COLUMNS = {
+    '학년': 'grade', 'grade': 'grade',
+    '반': 'class_num', 'class_num': 'class_num',
+    '번호': 'student_num', 'student_num': 'student_num',
+    '이름': 'name', 'name': 'name',
+    '비밀번호': 'pin', 'pin': 'pin',
+}
+
+
+def parse_roster_row(row, columns):
+    """CSV 한 줄을 (grade, class_num, student_num, name, pin)으로, 잘못된 줄이면 ValueError"""
+    values = {field: (row[i].strip() if i < len(row) else '') for field, i in columns.items()}
+    try:
+        grade = int(values['grade'])
+        class_num = int(values['class_num'])
+        student_num = int(values['student_num'])
+    except ValueError:
+        raise ValueError('학년, 반, 번호는 숫자로 입력해주세요')
+    if grade < 1 or grade > 6:
+        raise ValueError('학년은 1~6 사이로 입력해주세요')
+    if class_num < 1 or student_num < 1:
+        raise ValueError('반과 번호는 1 이상이어야 합니다')
+    if not values['name']:
+        raise ValueError('이름이 비어 있습니다')
+    pin = values.get('pin') or None
+    if pin is not None and (len(pin) != 4 or not pin.isdigit()):
+        raise ValueError('비밀번호는 숫자 4자리여야 합니다')
+    return grade, class_num, student_num, values['name'], pin
+
+
+def import_roster_batch(conn, batch, generate_pins, counts, generated):
+    """한 묶음을 한 트랜잭션으로 upsert하고 counts(inserted/updated/skipped/pins_generated)를 갱신
+
+    새로 만든 PIN은 관리자가 학생에게 나눠줄 수 있도록 generated에 학생 정보와 함께 덧붙인다.
+    """
+    with write_transaction(conn):
+        # 이미 있는 학생: 키 -> (평문 PIN, PIN 설정 여부)
+        existing = {
+            (r['grade'], r['class_num'], r['student_num'], r['name']): (r['pin'], r['pin'] is not None or r['pin_hash'] is not None)
+            for r in conn.execute('''
+                SELECT grade, class_num, student_num, name, pin, pin_hash FROM students
+                WHERE (grade, class_num, student_num, name) IN (
+                    SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'),
+                           json_extract(value, '$[2]'), json_extract(value, '$[3]')
+                    FROM json_each(?)
+                )
+            ''', (json.dumps([row[:4] for row in batch]),))
+        }
+
+        writes = []
+        for *key, pin in batch:
+            key = tuple(key)
+            current_pin, has_pin = existing.get(key, (None, False))
+            if pin is None and generate_pins and not has_pin:
+                pin = str(random.randint(1000, 9999))
+                counts['pins_generated'] += 1
+                generated.append(dict(zip(('grade', 'class_num', 'student_num', 'name', 'pin'), (*key, pin))))
+            if key not in existing:
+                counts['inserted'] += 1
+            elif pin is not None and pin != current_pin:
+                counts['updated'] += 1
+            else:
+                counts['skipped'] += 1
+                continue
+            # 같은 파일에 같은 학생이 또 나오면 기존 학생으로 취급
+            existing[key] = (pin, pin is not None or has_pin)
+            writes.append((*key, pin, hashlib.sha256(pin.encode()).hexdigest() if pin else None))
+
+        # PIN이 없는 줄은 기존 학생의 PIN을 지우지 않음
+        conn.executemany('''
+            INSERT INTO students (grade, class_num, student_num, name, pin, pin_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (grade, class_num, student_num, name) DO UPDATE
+            SET pin = excluded.pin, pin_hash = excluded.pin_hash
+            WHERE excluded.pin IS NOT NULL
+        ''', writes)
+
+
+@app.route('/api/admin/import/students', methods=['POST'])
+@admin_required
+def import_students():
+    """학생 명단 CSV(학년, 반, 번호, 이름[, 비밀번호])를 읽어 학생을 미리 등록
+
+    요청 본문(text/csv, 관리자 페이지가 보내는 방식)은 받는 대로 줄 단위로 읽으며 IMPORT_BATCH_SIZE줄씩
+    저장하므로 파일 전체를 메모리에 올리지 않는다. multipart의 file 필드도 받지만, 이때는 Werkzeug가 뷰가
+    실행되기 전에 업로드 전체를 받아 둔다 (작으면 메모리, 크면 임시 파일).
+    ?generate_pins=1이면 비밀번호가 없는 학생에게 랜덤 PIN을 만들고, 만든 PIN을 students 목록으로 돌려준다.
+    """
+    generate_pins = request.args.get('generate_pins') in ('1', 'true')
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline=''))
+
+    header = next(reader, None)
+    columns = {}
+    for i, title in enumerate(header or []):
+        field = IMPORT_COLUMNS.get(title.strip().lower())
+        if field and field not in columns:
+            columns[field] = i
+    missing = [title for title, field in (('학년', 'grade'), ('반', 'class_num'), ('번호', 'student_num'), ('이름', 'name'))
+               if field not in columns]
+    if missing:
+        return jsonify({'error': f"CSV 첫 줄에 {', '.join(missing)} 열이 필요합니다"}), 400
+
+    conn = get_db()
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0, 'pins_generated': 0}
+    generated = []
+    errors = []
+    batch = []
+    for line_num, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            batch.append(parse_roster_row(row, columns))
+        except ValueError as e:
+            counts['skipped'] += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append({'line': line_num, 'error': str(e)})
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            import_roster_batch(conn, batch, generate_pins, counts, generated)
+            batch = []
+    if batch:
+        import_roster_batch(conn, batch, generate_pins, counts, generated)
+
+    return jsonify({
+        'success': True,
+        **counts,
+        'students': generated,
+        'errors': errors,
+        'message': f"추가 {counts['inserted']}명, 갱신 {counts['updated']}명, 건너뜀 {counts['skipped']}명"
+                   + (f", 비밀번호 생성 {counts['pins_generated']}명" if generated else '')
+    })
+
 
+# ── Excel Export API ──
+
+EXPORT_BATCH_SIZE = 500
+# 지난 달 한 달치 내보내기는 여기에 만들어 두고 데이터가 바뀌기 전까지 파일 그대로 응답
+EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR') or os.path.join(os.path.dirname(DB_PATH), 'exports')
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8-sig',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# XLSX: 공유 문자열 표(sharedStrings) 없이 셀마다 inlineStr로 써서 행을 읽는 대로 바로 내보냄
+XLSX_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XLSX_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XLSX_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        f'<Relationships xmlns="{XLSX_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{XLSX_REL}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        f'<workbook xmlns="{XLSX_NS}" xmlns:r="{XLSX_REL}">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        f'<Relationships xmlns="{XLSX_PKG_REL}">'
+        f'<Relationship Id="rId1" Type="{XLSX_REL}/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+XLSX_COLUMNS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'  # 내보내는 열은 26개 이하
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def stream_csv(cursor, header, row_values):
+    """커서를 EXPORT_BATCH_SIZE 행씩 읽어 CSV 조각을 내보냄 (전체 파일을 메모리에 만들지 않음)"""
     output = io.StringIO()
+    writer = csv.writer(output)
     # UTF-8 BOM for Excel
     output.write('\ufeff')
-    writer = csv.writer(output)
-    writer.writerow(['번호', '날짜', '학년', '반', '번호', '이름', '질문 내용', '좋아요 수', '작성시간'])
+    writer.writerow(header)
+    yield output.getvalue()
+
+    while True:
+        rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+        if not rows:
+            break
+        output.seek(0)
+        output.truncate()
+        writer.writerows(row_values(r) for r in rows)
+        yield output.getvalue()
+
+
+class ChunkWriter:
+    """zipfile이 쓴 바이트를 모았다가 take()로 넘기는 쓰기 전용 스트림
 
-    for q in questions:
-        writer.writerow([
+    tell/seek이 없으므로 zipfile은 크기를 미리 몰라도 되는 데이터 디스크립터 방식으로 쓴다.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def xlsx_row(number, values):
+    cells = []
+    for column, value in zip(XLSX_COLUMNS, values):
+        ref = f'{column}{number}'
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = xml_escape(XML_INVALID_CHARS.sub('', str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+def stream_xlsx(cursor, header, row_values, sheet_name):
+    """커서를 EXPORT_BATCH_SIZE 행씩 읽어 압축한 XLSX 조각을 내보냄 (시트 XML도 행 단위로 씀)"""
+    output = ChunkWriter()
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as package:
+        for name, xml in XLSX_PARTS.items():
+            package.writestr(name, XML_HEADER + xml.replace('{sheet}', xml_escape(sheet_name)))
+        with package.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            # 첫 행(머리글)을 고정해 스크롤해도 보이게
+            sheet.write((
+                f'{XML_HEADER}<worksheet xmlns="{XLSX_NS}"><sheetViews><sheetView workbookViewId="0">'
+                '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                f'</sheetView></sheetViews><sheetData>{xlsx_row(1, header)}'
+            ).encode('utf-8'))
+            number = 1
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                sheet.write(''.join(xlsx_row(number + i, row_values(r)) for i, r in enumerate(rows, 1))
+                            .encode('utf-8'))
+                number += len(rows)
+                yield output.take()
+            sheet.write(b'</sheetData></worksheet>')
+    yield output.take()
+
+
+def closed_month(start_date, end_date):
+    """start~end가 이미 끝난 달 하나의 1일~말일이면 True"""
+    try:
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except ValueError:
+        return False
+    next_month = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start.day == 1 and end == next_month - timedelta(days=1) and next_month <= date.today()
+
+
+def export_fingerprint(conn, start_date, end_date):
+    """기간 안의 질문/좋아요(날짜별 피드 버전)나 학생 명단이 바뀌면 달라지는 값"""
+    versions = conn.execute(
+        "SELECT created_date, version FROM feed_versions WHERE created_date >= ? AND created_date <= ?",
+        (start_date, end_date)
+    ).fetchall()
+    students = conn.execute("SELECT COUNT(*) as cnt, MAX(id) as last_id FROM students").fetchone()
+    return hashlib.sha256(json.dumps([
+        [[v['created_date'], v['version']] for v in versions], students['cnt'], students['last_id']
+    ]).encode()).hexdigest()[:16]
+
+
+def write_export(path, chunks):
+    """내보내기 조각을 임시 파일에 쓴 뒤 path로 바꿔치기 (동시에 만들어도 반쯤 쓴 파일을 응답하지 않음)
+
+    쓴 파일을 처음부터 읽을 수 있게 열린 채로 돌려줌 (바로 다른 요청이 지워도 이 응답은 끝까지 보냄).
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, partial = tempfile.mkstemp(dir=directory, suffix='.partial')
+    f = os.fdopen(fd, 'w+b')
+    try:
+        for chunk in chunks:
+            f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        f.flush()
+        os.replace(partial, path)
+    except BaseException:
+        f.close()
+        os.remove(partial)
+        raise
+    f.seek(0)
+    return f
+
+
+def remove_old_exports(directory, prefix, keep):
+    """같은 기간/형식의 지난 지문 파일을 지움 (다른 요청이 먼저 지웠으면 넘어감, 보내는 중인 파일은 열려 있어 끝까지 감)"""
+    suffix = os.path.splitext(keep)[1]
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix) and name != os.path.basename(keep):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def export_response(kind, start_date, end_date, export_format, query, header, row_values, sheet_name):
+    """query()의 결과를 CSV/XLSX로 응답
+
+    지난 달 한 달치는 EXPORT_CACHE_DIR/<학교>/에 한 번 만들어 두고 파일로 응답한다 (파일 이름의 지문이
+    데이터와 같으면 재사용). 그 밖의 기간은 스트리밍으로 만든다.
+    """
+    filename = f'{kind}_{start_date}_{end_date}.{export_format}'
+
+    def chunks():
+        if export_format == 'xlsx':
+            return stream_xlsx(query(), header, row_values, sheet_name)
+        return stream_csv(query(), header, row_values)
+
+    if closed_month(start_date, end_date):
+        directory = os.path.join(EXPORT_CACHE_DIR, backup_name(current_tenant().path))
+        prefix = f'{kind}_{start_date}_{end_date}_'
+        fingerprint = export_fingerprint(get_db(), start_date, end_date)
+        path = os.path.join(directory, f'{prefix}{fingerprint}.{export_format}')
+        # 경로가 아니라 연 파일로 응답: 열고 나면 다른 요청이 지워도(새 지문으로 정리) 끝까지 보냄
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            # 처음이거나, 다른 요청의 정리와 겹쳐 방금 지워졌으면 다시 만듦
+            f = write_export(path, chunks())
+            remove_old_exports(directory, prefix, path)
+        stat = os.fstat(f.fileno())
+        response = send_file(f, as_attachment=True, download_name=filename, conditional=True,
+                             etag=f'{fingerprint}-{export_format}', last_modified=stat.st_mtime)
+        if response.status_code == 200:
+            response.content_length = stat.st_size
+        response.headers['Cache-Control'] = 'private, no-cache'
+    else:
+        # stream_with_context: 다 보낼 때까지 요청 컨텍스트(풀 연결)를 유지하고, 끝나면 teardown에서 반납
+        response = Response(stream_with_context(chunks()), headers={
+            'Content-Disposition': f'attachment; filename={filename}'
+        })
+    response.headers['Content-Type'] = EXPORT_MIMETYPES[export_format]
+    return response
+
+
+def export_args():
+    """(시작일, 종료일, 형식), 형식이 잘못되면 형식 자리에 None"""
+    start_date = request.args.get('start', '2020-01-01')
+    end_date = request.args.get('end', date.today().isoformat())
+    export_format = request.args.get('format', 'csv')
+    return start_date, end_date, export_format if export_format in EXPORT_MIMETYPES else None
+
+
+@app.route('/api/admin/export/questions')
+@admin_required
+def export_questions():
+    start_date, end_date, export_format = export_args()
+    if export_format is None:
+        return jsonify({'error': '지원하지 않는 형식입니다 (csv, xlsx)'}), 400
+
+    def query():
+        conn = get_db()
+        # 보관 DB와 겹치는 기간이면 두 DB를 이어서 읽음 (날짜가 겹치지 않으므로 정렬은 각자 인덱스로)
+        parts = range_tables(conn, start_date, end_date)
+        return conn.execute(f'''
+            SELECT * FROM ({' UNION ALL '.join(f"""
+                SELECT q.id, q.content, q.created_date, q.created_at, q.like_count,
+                       s.grade, s.class_num, s.student_num, s.name
+                FROM {table} q
+                JOIN students s ON q.student_id = s.id
+                WHERE q.created_date >= ? AND q.created_date <= ? AND q.is_deleted = 0
+            """ for table, _, _ in parts)})
+            ORDER BY created_date DESC, created_at DESC
+        ''', [d for _, start, end in parts for d in (start, end)])
+
+    return export_response(
+        'questions', start_date, end_date, export_format, query,
+        ['번호', '날짜', '학년', '반', '번호', '이름', '질문 내용', '좋아요 수', '작성시간'],
+        lambda q: [
             q['id'], q['created_date'], q['grade'], q['class_num'],
             q['student_num'], q['name'], q['content'],
             q['like_count'], q['created_at']
-        ])
-
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename=questions_{start_date}_{end_date}.csv',
-            'Content-Type': 'text/csv; charset=utf-8-sig'
-        }
+        ],
+        '질문'
     )
 
 
 @app.route('/api/admin/export/students')
 @admin_required
 def export_students():
-    start_date = request.args.get('start', '2020-01-01')
-    end_date = request.args.get('end', date.today().isoformat())
+    start_date, end_date, export_format = export_args()
+    if export_format is None:
+        return jsonify({'error': '지원하지 않는 형식입니다 (csv, xlsx)'}), 400
+
+    def query():
+        conn = get_db()
+        parts = range_tables(conn, start_date, end_date)
+        return conn.execute(f'''
+            SELECT s.grade, s.class_num, s.student_num, s.name,
+                   COUNT(q.id) as question_count,
+                   COALESCE(SUM(q.like_count), 0) as likes_received
+            FROM students s
+            LEFT JOIN ({' UNION ALL '.join(f"""
+                SELECT id, student_id, like_count FROM {table}
+                WHERE is_deleted = 0 AND created_date >= ? AND created_date <= ?
+            """ for table, _, _ in parts)}) q ON s.id = q.student_id
+            GROUP BY s.grade, s.class_num, s.student_num, s.name
+            ORDER BY s.grade, s.class_num, s.student_num, s.name
+        ''', [d for _, start, end in parts for d in (start, end)])
+
+    return export_response(
+        'students', start_date, end_date, export_format, query,
+        ['학년', '반', '번호', '이름', '질문 수', '받은 좋아요 수'],
+        lambda s: [
+            s['grade'], s['class_num'], s['student_num'],
+            s['name'], s['question_count'], s['likes_received']
+        ],
+        '학생별 통계'
+    )
 
-    conn = get_db()
-    students = conn.execute('''
-        SELECT s.grade, s.class_num, s.student_num, s.name,
-               COUNT(DISTINCT q.id) as question_count,
-               COUNT(DISTINCT l.id) as likes_received
-        FROM students s
-        LEFT JOIN questions q ON s.id = q.student_id AND q.is_deleted = 0
-                                AND q.created_date >= ? AND q.created_date <= ?
+
+# ── Maintenance Commands ──
+
+def tenant_option(f):
+    """여러 학교 모드에서 --tenant로 명령을 실행할 학교 DB를 고름"""
+    @click.option('--tenant', help='대상 학교 (여러 학교 모드에서 필수)')
+    @wraps(f)
+    def decorated(tenant, *args, **kwargs):
+        if TENANT_MODE:
+            if not tenant:
+                raise click.UsageError('여러 학교 모드에서는 --tenant를 지정하세요')
+            g.tenant = tenant_registry.acquire(tenant)
+            if g.tenant is None:
+                raise click.BadParameter(f'{tenant} 학교가 없습니다', param_hint='--tenant')
+        return f(*args, **kwargs)
+    return decorated
+
+
+def check_like_counts(conn, repair=False):
+    """likes 테이블 기준으로 questions.like_count가 맞는지 확인하고, repair=True면 바로잡음"""
+    mismatched = conn.execute('''
+        SELECT q.id, q.like_count, COUNT(l.id) as actual
+        FROM questions q
         LEFT JOIN likes l ON q.id = l.question_id
-        GROUP BY s.id
-        ORDER BY s.grade, s.class_num, s.student_num
-    ''', (start_date, end_date)).fetchall()
-    conn.close()
+        GROUP BY q.id
+        HAVING q.like_count != actual
+    ''').fetchall()
+    if repair and mismatched:
+        conn.executemany(
+            "UPDATE questions SET like_count = ? WHERE id = ?",
+            [(r['actual'], r['id']) for r in mismatched]
+        )
+        conn.commit()
+    return mismatched
 
-    output = io.StringIO()
-    output.write('\ufeff')
-    writer = csv.writer(output)
-    writer.writerow(['학년', '반', '번호', '이름', '질문 수', '받은 좋아요 수'])
 
-    for s in students:
-        writer.writerow([
-            s['grade'], s['class_num'], s['student_num'],
-            s['name'], s['question_count'], s['likes_received']
-        ])
-
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={
-            'Content-Disposition': f'attachment; filename=students_{start_date}_{end_date}.csv',
-            'Content-Type': 'text/csv; charset=utf-8-sig'
-        }
+def copy_archive_day(archive, day):
+    """day의 질문/좋아요를 학교 DB(live)에서 보관 DB로 복사 (이미 복사한 것은 지우고 현재 상태로 다시)"""
+    archive.execute(
+        "DELETE FROM likes WHERE question_id IN (SELECT id FROM questions WHERE created_date = ?)", (day,)
     )
+    archive.execute("DELETE FROM questions WHERE created_date = ?", (day,))
+    archive.execute('''
+        INSERT INTO questions (id, student_id, content, created_date, created_at, is_deleted, like_count)
+        SELECT id, student_id, content, created_date, created_at, is_deleted, like_count
+        FROM live.questions WHERE created_date = ?
+    ''', (day,))
+    archive.execute('''
+        INSERT INTO likes (id, question_id, student_id, created_at)
+        SELECT l.id, l.question_id, l.student_id, l.created_at
+        FROM live.likes l JOIN live.questions q ON q.id = l.question_id
+        WHERE q.created_date = ?
+    ''', (day,))
+
+
+def rebuild_archive_search(archive):
+    """보관 DB의 검색 색인을 다시 만듦 (보관 DB에 FTS5 색인이 없으면 그대로)"""
+    if archive.execute("SELECT 1 FROM sqlite_master WHERE name = 'questions_fts'").fetchone():
+        archive.execute("INSERT INTO questions_fts (questions_fts) VALUES ('rebuild')")
+        archive.commit()
+
+
+def archive_questions(conn, before):
+    """before 이전 날짜의 질문/좋아요를 보관 DB로 옮기고 옮긴 날짜 목록을 돌려줌
+
+    1) 날짜별로 보관 DB에 복사해서 커밋 (학교 DB 쓰기 잠금은 잡지 않음)
+    2) archive_before를 옮김 (이후 그 날짜 조회는 보관 DB로 감)
+    3) 설정 캐시가 모든 워커에서 바뀔 때까지 ARCHIVE_SETTLE_SECONDS초 기다린 뒤, 날짜별로 학교 DB 쓰기 잠금을 잡은 채
+       그 사이의 좋아요/수정/삭제까지 보관 DB에 다시 복사해 커밋하고 나서 학교 DB에서 지움
+    중간에 멈춰도 다시 실행하면 이어서 끝난다 (보관 DB 커밋 뒤 학교 DB에서 지우기 전에 멈추면 다음 실행이
+    다시 복사). 날짜별 집계와 명예의 전당 점수는 학교 DB에 그대로 둔다.
+    conn에는 보관 DB를 붙이지 않는다 (학교 DB 쓰기 트랜잭션이 보관 DB까지 잠가 복사를 막음).
+    """
+    path = archive_path()
+    init_archive(path)
+    dates = [r['created_date'] for r in conn.execute(
+        "SELECT DISTINCT created_date FROM questions WHERE created_date < ? ORDER BY created_date", (before,)
+    )]
+    archive = connect_db(path)
+    try:
+        archive.execute("ATTACH DATABASE ? AS live", (current_tenant().path,))
+        for day in dates:
+            copy_archive_day(archive, day)
+            archive.commit()
+        rebuild_archive_search(archive)
+
+        with write_transaction(conn):
+            if before > get_setting(conn, ARCHIVE_BEFORE_KEY, ''):
+                set_setting(conn, ARCHIVE_BEFORE_KEY, before)
+        current_tenant().settings_cache.invalidate()
+        if dates:
+            time.sleep(ARCHIVE_SETTLE_SECONDS)
+
+        fts = has_search_index(conn)
+        for day in dates:
+            with write_transaction(conn):
+                # 쓰기 잠금을 잡은 뒤의 상태가 최종본: 복사 이후의 변경도 보관 DB에 들어가고 나서 지워짐
+                copy_archive_day(archive, day)
+                archive.commit()
+                ids = [r['id'] for r in conn.execute("SELECT id FROM questions WHERE created_date = ?", (day,))]
+                if fts:
+                    conn.execute('''
+                        INSERT INTO questions_fts (questions_fts, rowid, content)
+                        SELECT 'delete', id, content FROM questions WHERE created_date = ? AND is_deleted = 0
+                    ''', (day,))
+                # 질문을 먼저 지우면 좋아요 삭제 트리거(like_count, daily_stats 갱신)가 아무것도 바꾸지 않음
+                conn.execute("PRAGMA defer_foreign_keys = ON")
+                conn.execute("DELETE FROM questions WHERE created_date = ?", (day,))
+                conn.execute("DELETE FROM likes WHERE question_id IN (SELECT value FROM json_each(?))",
+                             (json.dumps(ids),))
+        if dates:
+            rebuild_archive_search(archive)
+    finally:
+        archive.close()
+    return dates
+
+
+@app.cli.command('check-like-counts')
+@tenant_option
+@click.option('--repair', is_flag=True, help='불일치하는 like_count를 likes 테이블 기준으로 수정')
+def check_like_counts_command(repair):
+    """questions.like_count와 likes 테이블의 일치 여부 확인"""
+    mismatched = check_like_counts(get_db(), repair=repair)
+    for r in mismatched:
+        click.echo(f"질문 {r['id']}: like_count={r['like_count']}, 실제={r['actual']}")
+    if not mismatched:
+        click.echo('모든 like_count가 일치합니다.')
+    elif repair:
+        click.echo(f'{len(mismatched)}개의 질문을 수정했습니다.')
+    else:
+        click.echo(f'{len(mismatched)}개의 질문이 불일치합니다. --repair로 수정할 수 있습니다.')
+        raise SystemExit(1)
+
+
+@app.cli.command('rebuild-stats')
+@tenant_option
+def rebuild_stats_command():
+    """daily_stats, grade_daily_stats(날짜별/학년별 집계)와 grade_student_stats(학년별 학생 수)를 다시 계산"""
+    conn = get_db()
+    rebuild_daily_stats(conn)
+    rebuild_student_stats(conn)
+    conn.commit()
+    count = conn.execute("SELECT COUNT(*) as cnt FROM daily_stats").fetchone()['cnt']
+    click.echo(f'날짜별 집계를 다시 계산했습니다. ({count}일)')
+
+
+@app.cli.command('rebuild-search')
+@tenant_option
+def rebuild_search_command():
+    """질문 검색 색인(questions_fts)을 다시 만듦"""
+    conn = get_db()
+    if not has_search_index(conn):
+        click.echo('이 SQLite는 FTS5 trigram을 지원하지 않아 LIKE 검색을 사용합니다.')
+        return
+    rebuild_search_index(conn)
+    conn.commit()
+    click.echo('검색 색인을 다시 만들었습니다.')
 
 
-# 앱 시작 시 DB 초기화
-init_db()
+@app.cli.command('rebuild-hall')
+@tenant_option
+def rebuild_hall_command():
+    """hall_scores(명예의 전당 점수)를 questions 테이블에서 다시 계산"""
+    conn = get_db()
+    rebuild_hall_scores(conn)
+    conn.commit()
+    count = conn.execute("SELECT COUNT(*) as cnt FROM hall_scores").fetchone()['cnt']
+    click.echo(f'명예의 전당 점수를 다시 계산했습니다. ({count}명)')
+
+
+@app.cli.command('archive')
+@tenant_option
+@click.option('--before', help='이 날짜(YYYY-MM-DD) 이전 질문을 옮김 (기본: 명예의 전당 초기화 날짜)')
+def archive_command(before):
+    """지난 날짜의 질문/좋아요를 보관 DB로 옮겨 학교 DB와 인덱스를 작게 유지"""
+    conn = get_db()
+    hall_reset_date = get_setting(conn, 'hall_reset_date')
+    if not hall_reset_date:
+        raise click.ClickException('명예의 전당을 초기화한 적이 없습니다. 초기화 날짜 이전 질문만 옮길 수 있습니다.')
+    before = before or hall_reset_date
+    try:
+        date.fromisoformat(before)
+    except ValueError:
+        raise click.BadParameter('YYYY-MM-DD 형식으로 입력하세요', param_hint='--before')
+    # 명예의 전당 점수(rebuild-hall)는 초기화 날짜 이후 질문을 학교 DB에서 다시 세므로 그 이전만 옮김
+    if before > hall_reset_date:
+        raise click.BadParameter(f'명예의 전당 초기화 날짜({hall_reset_date}) 이후 질문은 옮길 수 없습니다',
+                                 param_hint='--before')
+    dates = archive_questions(conn, before)
+    if dates:
+        click.echo(f'{dates[0]} ~ {dates[-1]} ({len(dates)}일)의 질문을 보관 DB로 옮겼습니다: {archive_path()}')
+    else:
+        click.echo(f'{before} 이전에 옮길 질문이 없습니다.')
+
+@app.cli.command('migrate')
+@click.option('--tenant', help='여러 학교 모드에서 이 학교만 (생략하면 모든 학교)')
+def migrate_command(tenant):
+    """아직 적용하지 않은 스키마 마이그레이션을 적용 (배포 전에 미리 실행, AUTO_MIGRATE=0과 함께 사용)"""
+    if not TENANT_MODE:
+        targets = [(None, DB_PATH)]
+    else:
+        names = [tenant] if tenant else tenant_registry.names()
+        missing = [n for n in names if not tenant_registry.exists(n)]
+        if missing:
+            raise click.BadParameter(f'{missing[0]} 학교가 없습니다', param_hint='--tenant')
+        targets = [(n, tenant_registry.path(n)) for n in names]
+
+    for name, path in targets:
+        conn = connect_db(path)
+        try:
+            applied = migrate(conn)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+        prefix = f'[{name}] ' if name else ''
+        for number in applied:
+            click.echo(f'{prefix}{number}: {MIGRATIONS[number - 1].__doc__}')
+        click.echo(f'{prefix}스키마 버전 {version} ({len(applied)}개 적용)')
+
+
+@app.cli.command('tenant-create')
+@click.argument('name')
+def tenant_create_command(name):
+    """여러 학교 모드에서 새 학교 DB를 만듦 (기본 관리자 계정 admin / admin123 포함)"""
+    if not TENANT_NAME.match(name):
+        raise click.BadParameter('영문 소문자, 숫자, -로 40자 이내', param_hint='NAME')
+    path = tenant_registry.path(name)
+    if os.path.exists(path):
+        raise click.ClickException(f'{name} 학교가 이미 있습니다: {path}')
+    os.makedirs(TENANT_DIR, exist_ok=True)
+    conn = connect_db(path)
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
+    click.echo(f'{name} 학교 DB를 만들었습니다: {path}')
+
+
+@app.cli.command('backup')
+@click.option('--tenant', help='여러 학교 모드에서 이 학교만 (생략하면 모든 학교)')
+def backup_command(tenant):
+    """지금 바로 온라인 백업 (BACKUP_DIR에 DB마다 BACKUP_KEEP개 보관)"""
+    if tenant and not tenant_registry.exists(tenant):
+        raise click.BadParameter(f'{tenant} 학교가 없습니다', param_hint='--tenant')
+    for path in backup_targets(tenant):
+        result = backup_database(path)
+        click.echo(f"{result['file']}: {result['pages']}페이지, {result['size'] / 1024 / 1024:.1f}MB, "
+                   f"{result['seconds']}초 (복사 {result['copy_seconds']}초, 검사 {result['verify_seconds']}초)")
+
+
+@app.cli.command('backup-verify')
+@click.argument('file', type=click.Path(exists=True, dir_okay=False))
+def backup_verify_command(file):
+    """백업 파일에 PRAGMA integrity_check 실행"""
+    problems = verify_backup(file)
+    if problems:
+        for problem in problems[:20]:
+            click.echo(problem)
+        raise click.ClickException(f'{file}: 문제 {len(problems)}개')
+    click.echo(f'{file}: 이상 없음')
+
+
+@app.cli.command('backup-restore')
+@click.argument('file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--yes', is_flag=True, help='확인하지 않고 복원')
+def backup_restore_command(file, yes):
+    """백업 파일을 검사한 뒤 원래 DB에 복원 (복원 전에 지금 DB도 백업해 둠)"""
+    match = BACKUP_FILE.match(os.path.basename(file))
+    target = backup_source(match['name']) if match else None
+    if target is None:
+        raise click.ClickException(f'{file}: 어느 DB의 백업인지 알 수 없습니다 (<이름>-<YYYYmmdd-HHMMSS>.db)')
+    problems = verify_backup(file)
+    if problems:
+        raise click.ClickException(f'{file}: 백업 파일 검사 실패 ({problems[0]})')
+    if not yes:
+        click.confirm(f'{target}을(를) {file} 내용으로 덮어씁니다. 계속할까요?', abort=True)
+
+    if os.path.exists(target):
+        click.echo(f"지금 DB를 먼저 백업했습니다: {backup_database(target)['file']}")
+    source = sqlite3.connect(f'file:{pathname2url(os.path.abspath(file))}?mode=ro', uri=True)
+    dest = connect_db(target)
+    try:
+        # 한 단계로 복사: 쓰기 잠금을 잡은 채 한 번에 바뀌므로 실행 중인 앱도 복원 전/후 중 하나만 봄
+        source.backup(dest)
+    finally:
+        dest.close()
+        source.close()
+    click.echo(f'{target}을(를) 복원했습니다. 실행 중인 앱은 캐시를 비우도록 다시 시작하세요.')
+
+
+# 앱 시작 시 DB 초기화 (스키마가 최신이면 PRAGMA user_version만 읽음, 학교 DB는 처음 요청될 때)
+if not TENANT_MODE:
+    init_db()
+    if LIKE_WRITE_BEHIND:
+        # 지난 실행에서 기록하지 못한 좋아요를 첫 요청 전에 반영
+        default_tenant.like_buffer.start()
 
 if __name__ == '__main__':
     print("=" * 50)
@@ -0,0 +1,25 @@
+"""성능 측정 도구 (가상 학교 데이터 생성기, 부하 시나리오, 실행 계획 검사, 업그레이드/복구 검사)
+
+    python -m bench.seed --students 600 --days 60
+    python -m bench.run --output data/bench/before.json
+    python -m bench.run --compare data/bench/before.json
+    python -m bench.check       # plans, upgrade, likes를 모두 실행하고 하나라도 실패하면 종료 코드 1
+    python -m bench.plans
+    python -m bench.upgrade
+    python -m bench.likes
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB = os.path.join(ROOT, 'data', 'bench.db')
+
+
+def load_app(db_path):
+    """DB_PATH를 지정한 뒤 app 모듈을 불러옴 (import 시점에 init_db()가 실행됨)"""
+    os.environ['DB_PATH'] = os.path.abspath(db_path)
+    os.environ.setdefault('BACKUP_INTERVAL', '0')  # 측정 중에 자동 백업이 돌지 않도록
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import app
+    return app
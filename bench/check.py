@@ -0,0 +1,37 @@
+"""배포 전 검사 모음: 실행 계획(bench.plans), 업그레이드(bench.upgrade), 좋아요 복구(bench.likes)
+
+검사마다 app 모듈을 새로 불러와야 하므로(import 시점에 DB_PATH로 init_db()가 실행됨) 각각 별도 프로세스로
+실행하고, 하나라도 실패하면 종료 코드 1. 마이그레이션, 인덱스, 쿼리, LikeBuffer를 고친 뒤에 실행한다.
+
+    python -m bench.check
+    python -m bench.check plans upgrade     # 일부만 실행
+"""
+import argparse
+import subprocess
+import sys
+
+from bench import ROOT
+
+CHECKS = ['plans', 'upgrade', 'likes']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='배포 전 검사 모음')
+    parser.add_argument('checks', nargs='*', metavar='CHECK',
+                        help=f'실행할 검사 (기본: 전부, 선택: {", ".join(CHECKS)})')
+    args = parser.parse_args()
+    unknown = [name for name in args.checks if name not in CHECKS]
+    if unknown:
+        parser.error(f'알 수 없는 검사: {", ".join(unknown)}')
+
+    failed = []
+    for name in args.checks or CHECKS:
+        print(f'── bench.{name}', flush=True)
+        if subprocess.run([sys.executable, '-m', f'bench.{name}'], cwd=ROOT).returncode != 0:
+            failed.append(name)
+    print('검사 ' + ('모두 통과' if not failed else f'실패: {", ".join(failed)}'))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
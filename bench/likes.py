@@ -0,0 +1,105 @@
+"""좋아요 write-behind 재시작 복구 검사
+
+LIKE_WRITE_BEHIND=1로 띄운 프로세스가 좋아요를 받은 뒤 기록 주기 전에 죽으면(저널에만 남음),
+다음 시작 때 요청을 받기 전에 저널이 DB에 반영되고 첫 피드부터 좋아요 수가 맞는지 확인한다.
+실패하면 종료 코드 1. LikeBuffer를 고친 뒤에 실행한다.
+
+    python -m bench.likes
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from bench import ROOT, load_app
+from bench.seed import PIN, seed
+
+LIKERS = 7
+
+
+def login(app, student):
+    client = app.app.test_client()
+    grade, class_num, student_num, name = student
+    response = client.post('/api/login', json={'grade': grade, 'class_num': class_num,
+                                               'student_num': student_num, 'name': name, 'pin': PIN})
+    assert response.status_code == 200, response.get_json()
+    return client
+
+
+def crash(db_path):
+    """좋아요 LIKERS개를 누르고, 기록 스레드가 돌기 전에 (atexit도 없이) 프로세스를 끝냄"""
+    seed(db_path, students=30, days=2, likes=0)
+    app = load_app(db_path)
+    conn = sqlite3.connect(db_path)
+    question_id, created_date = conn.execute(
+        "SELECT id, created_date FROM questions ORDER BY id LIMIT 1"
+    ).fetchone()
+    students = conn.execute(
+        "SELECT grade, class_num, student_num, name FROM students ORDER BY id LIMIT ?", (LIKERS,)
+    ).fetchall()
+    conn.close()
+    for student in students:
+        response = login(app, student).post(f'/api/questions/{question_id}/like')
+        assert response.get_json()['liked'], response.get_json()
+    print(question_id, created_date, flush=True)
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='좋아요 저널 재시작 복구 검사')
+    parser.add_argument('--crash', metavar='DB', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    env = {**os.environ, 'LIKE_WRITE_BEHIND': '1', 'BACKUP_INTERVAL': '0'}
+    os.environ.update(env)
+    if args.crash:
+        os.environ['LIKE_FLUSH_INTERVAL'] = '3600'
+        crash(args.crash)
+
+    workdir = tempfile.mkdtemp(prefix='likes-')
+    problems = []
+    try:
+        db_path = os.path.join(workdir, 'questions.db')
+        output = subprocess.run(
+            [sys.executable, '-m', 'bench.likes', '--crash', db_path],
+            cwd=ROOT, env=env, check=True, capture_output=True, text=True
+        ).stdout.split()
+        question_id, created_date = int(output[0]), output[1]
+
+        journal = os.path.join(workdir, 'likes.journal')
+        with open(journal, encoding='utf-8') as f:
+            pending = len(f.readlines())
+        conn = sqlite3.connect(db_path)
+        stored = conn.execute("SELECT like_count FROM questions WHERE id = ?", (question_id,)).fetchone()[0]
+        if pending != LIKERS or stored != 0:
+            problems.append(f'준비 실패: 저널 {pending}줄, DB 좋아요 {stored}개 (기대값 {LIKERS}줄, 0개)')
+
+        # 다시 시작: import만 하고 아직 아무 요청도 보내지 않음
+        app = load_app(db_path)
+        stored = conn.execute("SELECT like_count FROM questions WHERE id = ?", (question_id,)).fetchone()[0]
+        if stored != LIKERS:
+            problems.append(f'시작 직후 DB 좋아요 {stored}개, 기대값 {LIKERS}개')
+        student = conn.execute(
+            "SELECT grade, class_num, student_num, name FROM students ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        conn.close()
+
+        feed = login(app, student).get('/api/questions', query_string={'date': created_date}).get_json()
+        served = next((q['like_count'] for q in feed['questions'] if q['id'] == question_id), None)
+        if served != LIKERS:
+            problems.append(f'피드 좋아요 {served}개, 기대값 {LIKERS}개')
+        app.tenant_registry.close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for problem in problems:
+        print('FAIL', problem)
+    print('좋아요 저널 재시작 복구: ' + ('문제 없음' if not problems else f'문제 {len(problems)}개'))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
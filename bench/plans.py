@@ -0,0 +1,180 @@
+"""쿼리 실행 계획 회귀 검사
+
+bench.seed로 만든 DB 복사본에서 주요 엔드포인트를 한 번씩 호출하며 실행된 SQL을 모두 모으고,
+각 SQL의 EXPLAIN QUERY PLAN에 전체 테이블 스캔이나 임시 B-tree 정렬이 있으면 실패(종료 코드 1)한다.
+인덱스를 바꾸거나 쿼리를 고친 뒤에 실행한다 (python -m bench.check에 포함).
+--db가 없으면(기본 경로에도 DB가 없으면) 기본 크기의 가상 학교 데이터를 임시로 만들어 검사한다.
+
+    python -m bench.plans
+    python -m bench.plans --db data/bench.db     # bench.seed로 만든 DB를 복사해서 검사
+    python -m bench.plans --verbose     # 통과한 쿼리의 실행 계획도 출력
+"""
+import argparse
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from bench import DEFAULT_DB, load_app
+from bench.seed import PIN, seed
+
+# 허용하는 실행 계획 줄: (SQL 정규식 또는 None, 계획 줄 정규식, 이유)
+ALLOWED = [
+    (None, r'^SCAN json_each VIRTUAL TABLE', '요청으로 받은 id 목록을 도는 것'),
+    (None, r'^SCAN CONSTANT ROW', '상수 SELECT'),
+    (None, r'^SCAN questions_fts VIRTUAL TABLE', 'FTS5 MATCH (색인 조회)'),
+    (r'bm25\(', r'USE TEMP B-TREE FOR ORDER BY', '검색 관련도 순서는 색인으로 정렬할 수 없음 (결과는 LIMIT개)'),
+    (r'q\.content LIKE', r'^SCAN q$', '3글자 미만 검색어: id 역순으로 읽으며 LIMIT개를 채울 때까지 LIKE'),
+    (None, r'^SCAN \w+ USING (COVERING )?INDEX idx_hall_scores_rank', '명예의 전당 순위 순서로 LIMIT까지만 읽음'),
+    (None, r'^SCAN \w+ USING (COVERING )?INDEX sqlite_autoindex_students_1', '학생 명단 (학년, 반, 번호 순)'),
+    (None, r'^SCAN \w+ USING (COVERING )?INDEX idx_grade_daily_stats_grade', '학년별 집계 (날짜 수 x 6행)'),
+    (None, r'^SCAN grade_student_stats\b', '학년별 학생 수 집계 (학년마다 한 행)'),
+    (None, r'^SCAN daily_stats\b', '날짜별 집계 테이블 (하루 한 행)'),
+    (None, r'^SCAN hall_scores', '명예의 전당에 오른 학생 수 COUNT(*)'),
+    (None, r'^SCAN students USING COVERING INDEX', '학생 수 COUNT(*)'),
+    (None, r'^SCAN settings\b', '설정 캐시 전체 로드 (몇 행뿐)'),
+    (None, r'^SCAN sqlite_sequence\b', 'AUTOINCREMENT 테이블마다 한 행'),
+]
+PROBLEMS = (re.compile(r'^SCAN '), re.compile(r'USE TEMP B-TREE'))
+
+# 검사에서 빼는 SQL: 쓰기/트랜잭션 제어, 트리거 안의 문장(-- 로 시작), FTS5 내부 테이블 조회
+IGNORED_SQL = re.compile(
+    r"^\s*(PRAGMA|BEGIN|COMMIT|ROLLBACK|INSERT|UPDATE|DELETE|--|SELECT 1 FROM sqlite_master)"
+    r"|'main'\.'questions_fts_", re.I
+)
+
+
+def capture(app):
+    """풀 연결이 실행하는 SQL을 (파라미터가 채워진 채로) 모음"""
+    statements = []
+    connect = app.connect_db
+
+    def traced_connect(path=None):
+        conn = connect(path)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    app.connect_db = traced_connect
+    return statements
+
+
+def exercise(app, db_path):
+    """학생/관리자 주요 엔드포인트를 한 번씩 호출"""
+    client = app.app.test_client()
+    conn = sqlite3.connect(db_path)
+    grade, class_num, student_num, name = conn.execute(
+        "SELECT grade, class_num, student_num, name FROM students ORDER BY id LIMIT 1"
+    ).fetchone()
+    past = conn.execute("SELECT MAX(created_date) FROM questions").fetchone()[0] or date.today().isoformat()
+    question_id = conn.execute("SELECT MAX(id) FROM questions").fetchone()[0] or 1
+    conn.close()
+    start = (date.fromisoformat(past) - timedelta(days=7)).isoformat()
+
+    responses = [
+        client.post('/api/login', json={'grade': grade, 'class_num': class_num,
+                                        'student_num': student_num, 'name': name, 'pin': PIN}),
+        client.get('/api/me'),
+        client.get('/api/topic'),
+        client.get('/api/dates'),
+        client.get('/api/questions'),
+        client.get('/api/questions', query_string={'date': past}),
+        client.get('/api/questions', query_string={'date': past, 'sort': 'likes'}),
+        client.get('/api/questions', query_string={'date': past, 'limit': 20}),
+        client.get('/api/questions', query_string={'date': past, 'sort': 'likes', 'limit': 20}),
+        client.get('/api/questions', query_string={'date': past, 'grade': grade, 'limit': 20}),
+        client.get('/api/questions', query_string={'date': past, 'grade': grade, 'class_num': class_num}),
+        client.post('/api/questions', json={'content': '실행 계획 검사용 질문'}),
+        client.post(f'/api/questions/{question_id}/like'),
+        client.post(f'/api/questions/{question_id}/like'),
+    ]
+    # 글쓰기/좋아요 이벤트가 쌓인 뒤의 변경분 조회 (since=0이면 events 전체라 SCAN이 맞음)
+    since = client.get('/api/questions').get_json()['changes_cursor'] - 1
+    responses += [
+        client.get('/api/questions/changes', query_string={'since': since}),
+        client.get('/api/hall-of-fame'),
+    ]
+
+    admin = app.app.test_client()
+    responses += [
+        admin.post('/api/admin/login', json={'username': 'admin', 'password': 'admin123'}),
+        admin.get('/api/admin/stats'),
+        admin.get('/api/admin/questions', query_string={'date': past}),
+        admin.get('/api/admin/students'),
+        admin.get('/api/admin/search', query_string={'q': '궁금한'}),
+        admin.get('/api/admin/search', query_string={'q': '공룡 왜'}),
+    ]
+    for path in ('/api/admin/export/questions', '/api/admin/export/students'):
+        response = admin.get(path, query_string={'start': start, 'end': past})
+        response.get_data()
+        responses.append(response)
+
+    failed = [r for r in responses if r.status_code >= 400]
+    if failed:
+        raise SystemExit(f'엔드포인트 호출 실패: {[(r.request.path, r.status_code) for r in failed]}')
+
+
+def check(db_path, statements, verbose=False):
+    conn = sqlite3.connect(db_path)
+    problems = 0
+    seen = set()
+    for sql in statements:
+        normalized = ' '.join(sql.split())
+        if normalized in seen or IGNORED_SQL.search(normalized):
+            continue
+        seen.add(normalized)
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql)]
+        bad = [line for line in plan
+               if any(p.search(line) for p in PROBLEMS)
+               and not any((sql_pattern is None or re.search(sql_pattern, normalized)) and re.search(pattern, line)
+                           for sql_pattern, pattern, _ in ALLOWED)]
+        if bad or verbose:
+            print(('FAIL ' if bad else 'ok   ') + normalized[:200])
+            for line in plan:
+                print(('   ! ' if line in bad else '     ') + line)
+        problems += bool(bad)
+    conn.close()
+    print(f'\n쿼리 {len(seen)}개 검사, 문제 {problems}개')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='주요 쿼리의 실행 계획 검사')
+    parser.add_argument('--db', help=f'bench.seed로 만든 원본 DB (복사본으로 실행, 기본: {DEFAULT_DB})')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if args.db and not os.path.exists(args.db):
+        parser.error(f'{args.db}가 없습니다. 먼저 python -m bench.seed를 실행하세요.')
+    source_db = args.db or (DEFAULT_DB if os.path.exists(DEFAULT_DB) else None)
+
+    workdir = tempfile.mkdtemp(prefix='plans-')
+    try:
+        db_copy = os.path.join(workdir, 'bench.db')
+        if source_db:
+            source = sqlite3.connect(source_db)
+            target = sqlite3.connect(db_copy)
+            source.backup(target)
+            source.close()
+            target.close()
+        else:
+            print('원본 DB가 없어 가상 학교 데이터를 임시로 만듭니다')
+            seed(db_copy)
+
+        app = load_app(db_copy)
+        statements = capture(app)
+        exercise(app, db_copy)
+        # 통계가 있어야 실제 운영 DB와 같은 계획이 나옴
+        conn = sqlite3.connect(db_copy)
+        conn.execute('ANALYZE')
+        conn.close()
+        problems = check(db_copy, statements, args.verbose)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
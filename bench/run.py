@@ -0,0 +1,250 @@
+"""부하 시나리오 실행기
+
+bench.seed로 만든 DB를 임시 복사본으로 떠서 (매번 같은 상태에서 시작) Flask 테스트 클라이언트로
+시나리오를 동시에 실행하고, 엔드포인트별 p50/p95/p99 지연시간과 처리량을 출력/저장한다.
+
+    python -m bench.run --users 30 --rounds 5 --output data/bench/after.json
+    python -m bench.run --compare data/bench/before.json
+    python -m bench.run --scenarios feed_refresh,hall_polling
+
+시나리오: login_burst, posting_burst, feed_refresh, like_storm, hall_polling, csv_export
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bench import DEFAULT_DB, ROOT, load_app
+from bench.seed import PIN
+
+SCENARIOS = ['login_burst', 'posting_burst', 'feed_refresh', 'like_storm', 'hall_polling', 'csv_export']
+
+
+class Recorder:
+    """엔드포인트별 요청 지연시간과 오류 수를 모음"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.wall = {}
+        self.requests = {}
+
+    def call(self, name, fn, *args, **kwargs):
+        started = time.perf_counter()
+        response = fn(*args, **kwargs)
+        if not response.is_streamed:
+            response.get_data()
+        else:
+            for _ in response.response:
+                pass
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.samples[name].append(elapsed)
+            if response.status_code >= 400:
+                self.errors[name] += 1
+        return response
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_parallel(recorder, scenario, workers, task, items):
+    before = sum(len(v) for v in recorder.samples.values())
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(task, items))
+    recorder.wall[scenario] = time.perf_counter() - started
+    recorder.requests[scenario] = sum(len(v) for v in recorder.samples.values()) - before
+    return results
+
+
+def pick_students(db_path, count):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT grade, class_num, student_num, name FROM students ORDER BY grade, class_num, student_num LIMIT ?",
+        (count,)
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def run_benchmark(app, db_path, scenarios, users, rounds, seed):
+    recorder = Recorder()
+    rng = random.Random(seed)
+    flask_app = app.app
+
+    # 한 반이 동시에 로그인 (이후 시나리오는 이 클라이언트들을 재사용)
+    def login(student):
+        client = flask_app.test_client()
+        grade, class_num, student_num, name = student
+        recorder.call('POST /api/login', client.post, '/api/login', json={
+            'grade': grade, 'class_num': class_num, 'student_num': student_num, 'name': name, 'pin': PIN
+        })
+        return client
+
+    students = pick_students(db_path, users)
+    clients = run_parallel(recorder, 'login_burst', users, login, students)
+
+    if 'posting_burst' in scenarios:
+        run_parallel(recorder, 'posting_burst', users, lambda c: recorder.call(
+            'POST /api/questions', c.post, '/api/questions', json={'content': '부하 테스트 질문입니다'}
+        ), clients)
+
+    if 'feed_refresh' in scenarios:
+        # app.js처럼 직전 ETag를 If-None-Match로 보내며 반복 조회
+        def refresh(client):
+            etag = None
+            for _ in range(rounds):
+                headers = {'If-None-Match': etag} if etag else {}
+                response = recorder.call('GET /api/questions', client.get, '/api/questions', headers=headers)
+                etag = response.headers.get('ETag', etag)
+        run_parallel(recorder, 'feed_refresh', users, refresh, clients)
+
+    if 'like_storm' in scenarios:
+        feed = clients[0].get('/api/questions').get_json()['questions']
+        question_ids = [q['id'] for q in feed] or [1]
+        plans = [(client, [rng.choice(question_ids) for _ in range(rounds * 2)]) for client in clients]
+
+        def storm(plan):
+            client, targets = plan
+            for qid in targets:
+                recorder.call('POST /api/questions/<id>/like', client.post, f'/api/questions/{qid}/like')
+        run_parallel(recorder, 'like_storm', users, storm, plans)
+
+    if 'hall_polling' in scenarios:
+        def poll_hall(client):
+            for _ in range(rounds):
+                recorder.call('GET /api/hall-of-fame', client.get, '/api/hall-of-fame')
+        run_parallel(recorder, 'hall_polling', users, poll_hall, clients)
+
+    if 'csv_export' in scenarios:
+        admin = flask_app.test_client()
+        admin.post('/api/admin/login', json={'username': 'admin', 'password': 'admin123'})
+
+        def export(_):
+            recorder.call('GET /api/admin/export/questions', admin.get,
+                          '/api/admin/export/questions', query_string={'start': '2020-01-01'}, buffered=False)
+        run_parallel(recorder, 'csv_export', 1, export, range(max(1, rounds // 2)))
+
+    return recorder
+
+
+def summarize(recorder):
+    endpoints = {}
+    for name, values in recorder.samples.items():
+        endpoints[name] = {
+            'count': len(values),
+            'errors': recorder.errors[name],
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'max_ms': round(max(values) * 1000, 2),
+        }
+    scenarios = {
+        name: {
+            'seconds': round(seconds, 3),
+            'requests': recorder.requests[name],
+            'rps': round(recorder.requests[name] / seconds, 1) if seconds else None,
+        }
+        for name, seconds in recorder.wall.items()
+    }
+    return {'endpoints': endpoints, 'scenarios': scenarios}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result, baseline=None):
+    header = f"{'endpoint':<36}{'count':>7}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, stats in sorted(result['endpoints'].items()):
+        line = (f"{name:<36}{stats['count']:>7}{stats['errors']:>5}"
+                f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['max_ms']:>9.2f}")
+        before = (baseline or {}).get('endpoints', {}).get(name)
+        if before:
+            line += f"   p50 {before['p50_ms']:.2f}→{stats['p50_ms']:.2f}, p95 {before['p95_ms']:.2f}→{stats['p95_ms']:.2f}"
+        print(line)
+    print()
+    for scenario, stats in result['scenarios'].items():
+        line = f"{scenario:<16}{stats['requests']:>6}건 {stats['seconds']:>8.3f}s {stats['rps'] or 0:>8.1f} req/s"
+        before = (baseline or {}).get('scenarios', {}).get(scenario)
+        if before and before.get('rps'):
+            line += f"   (이전 {before['rps']:.1f} req/s)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='부하 시나리오 실행')
+    parser.add_argument('--db', default=DEFAULT_DB, help='bench.seed로 만든 원본 DB (복사본으로 실행)')
+    parser.add_argument('--users', type=int, default=30, help='동시 접속 학생 수')
+    parser.add_argument('--rounds', type=int, default=5, help='학생 한 명당 반복 횟수')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='결과를 저장할 JSON 파일')
+    parser.add_argument('--compare', help='비교할 이전 결과 JSON 파일')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f'{args.db}가 없습니다. 먼저 python -m bench.seed를 실행하세요.')
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    try:
+        db_copy = os.path.join(workdir, 'bench.db')
+        source = sqlite3.connect(args.db)
+        target = sqlite3.connect(db_copy)
+        source.backup(target)
+        source.close()
+        target.close()
+
+        app = load_app(db_copy)
+        recorder = run_benchmark(app, db_copy, scenarios, args.users, args.rounds, args.seed)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'db': args.db,
+            'users': args.users,
+            'rounds': args.rounds,
+            'scenarios': scenarios,
+        },
+        **summarize(recorder),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'\n결과 저장: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""가상 학교 데이터 생성기
+
+학생 수, 기간(일), 하루 참여율, 질문당 평균 좋아요 수를 지정해 DB를 채운다.
+같은 --seed면 항상 같은 데이터가 만들어진다. 오늘 날짜 질문은 만들지 않는다
+(bench.run의 글쓰기 시나리오가 오늘 질문을 올림).
+
+    python -m bench.seed --db data/bench.db --students 600 --days 60 --likes 5
+"""
+import argparse
+import hashlib
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from bench import DEFAULT_DB, load_app
+
+PIN = '1234'
+CLASSES_PER_GRADE = 4
+
+TOPICS = ['하늘', '바다', '공룡', '우주', '식물', '곤충', '날씨', '화산', '로봇', '음식']
+TEMPLATES = [
+    '{}은(는) 왜 그렇게 생겼을까요?',
+    '{}에 대해 가장 궁금한 점은 무엇인가요?',
+    '{}이(가) 없으면 어떻게 될까요?',
+    '{}은(는) 언제부터 있었을까요?',
+]
+
+
+def student_rows(count):
+    pin_hash = hashlib.sha256(PIN.encode()).hexdigest()
+    for i in range(count):
+        grade = i % 6 + 1
+        class_num = (i // 6) % CLASSES_PER_GRADE + 1
+        student_num = i // (6 * CLASSES_PER_GRADE) + 1
+        yield grade, class_num, student_num, f'학생{i + 1}', PIN, pin_hash
+
+
+def seed(db_path, students=600, days=60, participation=0.6, likes=5, seed=42, reset=False):
+    """db_path에 가상 데이터를 채우고 (학생 수, 질문 수, 좋아요 수)를 돌려줌"""
+    if reset:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    app = load_app(db_path)
+    conn = app.connect_db(db_path)
+    rng = random.Random(seed)
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO students (grade, class_num, student_num, name, pin, pin_hash) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        student_rows(students)
+    )
+    student_ids = [r['id'] for r in conn.execute("SELECT id FROM students ORDER BY id")]
+
+    # 오늘 이전 days일 동안의 질문 (트리거가 like_count, 집계, 검색 색인을 함께 채움)
+    today = date.today()
+    for offset in range(days, 0, -1):
+        day = (today - timedelta(days=offset)).isoformat()
+        authors = [sid for sid in student_ids if rng.random() < participation]
+        conn.executemany(
+            "INSERT INTO questions (student_id, content, created_date, created_at) VALUES (?, ?, ?, ?)",
+            [(sid,
+              rng.choice(TEMPLATES).format(rng.choice(TOPICS)) + f' #{n}',
+              day,
+              f'{day} {8 + n * 6 // max(len(authors), 1):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}')
+             for n, sid in enumerate(authors)]
+        )
+        question_ids = [r['id'] for r in conn.execute(
+            "SELECT id FROM questions WHERE created_date = ?", (day,)
+        )]
+        like_rows = []
+        for qid in question_ids:
+            for sid in rng.sample(student_ids, min(rng.randint(0, likes * 2), len(student_ids))):
+                like_rows.append((qid, sid))
+        conn.executemany("INSERT OR IGNORE INTO likes (question_id, student_id) VALUES (?, ?)", like_rows)
+        conn.commit()
+
+    counts = tuple(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                   for table in ('students', 'questions', 'likes'))
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='가상 학교 데이터로 DB 채우기')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'대상 DB 파일 (기본: {DEFAULT_DB})')
+    parser.add_argument('--students', type=int, default=600)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--participation', type=float, default=0.6, help='하루에 질문을 올리는 학생 비율')
+    parser.add_argument('--likes', type=int, default=5, help='질문당 평균 좋아요 수')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='기존 DB 파일을 지우고 새로 만듦')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    students, questions, likes = seed(
+        args.db, args.students, args.days, args.participation, args.likes, args.seed, args.reset
+    )
+    print(f'{args.db}: 학생 {students}명, 질문 {questions}개, 좋아요 {likes}개 '
+          f'({time.perf_counter() - started:.1f}초)')
+
+
+if __name__ == '__main__':
+    main()
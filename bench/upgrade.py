@@ -0,0 +1,158 @@
+"""기존 배포 DB 업그레이드 검사
+
+마이그레이션 체계 이전(첫 배포 때의 스키마, like_count/집계/색인 없음)의 DB를 임시로 만들고
+그 위에서 앱을 시작해 모든 마이그레이션이 오류 없이 적용되는지, 옮겨진 값이 맞는지,
+주요 엔드포인트가 응답하는지 확인한다. 실패하면 종료 코드 1. 마이그레이션을 고친 뒤에 실행한다.
+
+    python -m bench.upgrade
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from bench import load_app
+from bench.seed import PIN
+
+# 첫 배포 때 init_db()가 만들던 스키마 그대로 (이후 단계는 모두 마이그레이션이 채워야 함)
+BASELINE_SCHEMA = '''
+    CREATE TABLE students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        grade INTEGER NOT NULL,
+        class_num INTEGER NOT NULL,
+        student_num INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        pin TEXT DEFAULT NULL,
+        pin_hash TEXT DEFAULT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(grade, class_num, student_num, name)
+    );
+
+    CREATE TABLE questions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        created_date TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        is_deleted INTEGER DEFAULT 0,
+        FOREIGN KEY (student_id) REFERENCES students(id)
+    );
+
+    CREATE TABLE likes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        question_id INTEGER NOT NULL,
+        student_id INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE(question_id, student_id),
+        FOREIGN KEY (question_id) REFERENCES questions(id),
+        FOREIGN KEY (student_id) REFERENCES students(id)
+    );
+
+    CREATE TABLE admins (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE TABLE settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+
+    CREATE INDEX idx_questions_date ON questions(created_date);
+    CREATE INDEX idx_questions_student ON questions(student_id);
+    CREATE INDEX idx_likes_question ON likes(question_id);
+    CREATE INDEX idx_likes_student ON likes(student_id);
+'''
+
+
+def create_baseline(db_path):
+    """첫 배포 스키마의 DB에 학생 4명, 이틀치 질문(삭제된 것 포함), 좋아요를 넣고 기대값을 돌려줌"""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(BASELINE_SCHEMA)
+    pin_hash = hashlib.sha256(PIN.encode()).hexdigest()
+    conn.executemany(
+        "INSERT INTO students (grade, class_num, student_num, name, pin, pin_hash) VALUES (?, ?, ?, ?, ?, ?)",
+        [(grade, 1, 1, f'학생{grade}', PIN, pin_hash) for grade in range(1, 5)]
+    )
+    conn.execute("INSERT INTO admins (username, password_hash) VALUES (?, ?)",
+                 ('admin', hashlib.sha256('admin123'.encode()).hexdigest()))
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    earlier = (date.today() - timedelta(days=2)).isoformat()
+    conn.executemany(
+        "INSERT INTO questions (student_id, content, created_date, is_deleted) VALUES (?, ?, ?, ?)",
+        [(1, '하늘은 왜 파란가요?', yesterday, 0),
+         (2, '공룡은 왜 사라졌나요?', yesterday, 0),
+         (3, '삭제된 질문', yesterday, 1),
+         (4, '바다는 왜 짠가요?', earlier, 0)]
+    )
+    conn.executemany("INSERT INTO likes (question_id, student_id) VALUES (?, ?)",
+                     [(1, 2), (1, 3), (1, 4), (2, 1), (4, 1)])
+    conn.commit()
+    conn.close()
+    return yesterday, {1: 3, 2: 1, 3: 0, 4: 1}
+
+
+def check(app, db_path, yesterday, like_counts):
+    problems = []
+    conn = sqlite3.connect(db_path)
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version != len(app.MIGRATIONS):
+        problems.append(f'user_version {version}, 기대값 {len(app.MIGRATIONS)}')
+    counts = dict(conn.execute("SELECT id, like_count FROM questions"))
+    if counts != like_counts:
+        problems.append(f'like_count {counts}, 기대값 {like_counts}')
+    stats = conn.execute(
+        "SELECT question_count, like_count FROM daily_stats WHERE created_date = ?", (yesterday,)
+    ).fetchone()
+    if stats != (2, 4):
+        problems.append(f'{yesterday} daily_stats {stats}, 기대값 (2, 4)')
+    integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    if integrity != 'ok':
+        problems.append(f'integrity_check: {integrity}')
+    conn.close()
+
+    client = app.app.test_client()
+    login = client.post('/api/login', json={'grade': 2, 'class_num': 1, 'student_num': 1,
+                                            'name': '학생2', 'pin': PIN})
+    feed = client.get('/api/questions', query_string={'date': yesterday})
+    page = client.get('/api/questions', query_string={'date': yesterday, 'sort': 'likes', 'limit': 1})
+    responses = [login, feed, page, client.get('/api/dates'), client.get('/api/hall-of-fame')]
+    admin = app.app.test_client()
+    responses += [admin.post('/api/admin/login', json={'username': 'admin', 'password': 'admin123'}),
+                  admin.get('/api/admin/stats'),
+                  admin.get('/api/admin/search', query_string={'q': '공룡'})]
+    problems += [f'{r.request.path} → {r.status_code}' for r in responses if r.status_code >= 400]
+
+    if feed.status_code == 200:
+        questions = {q['id']: q for q in feed.get_json()['questions']}
+        if sorted(questions) != [1, 2] or not questions[1]['liked_by_me'] or not questions[2]['is_mine']:
+            problems.append(f'피드 내용이 다름: {feed.get_json()["questions"]}')
+    if page.status_code == 200 and [q['id'] for q in page.get_json()['questions']] != [1]:
+        problems.append(f'좋아요순 첫 페이지가 다름: {page.get_json()["questions"]}')
+    return problems
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='upgrade-')
+    try:
+        db_path = os.path.join(workdir, 'questions.db')
+        yesterday, like_counts = create_baseline(db_path)
+        # import 시점의 init_db()가 마이그레이션을 모두 적용 (여기서 실패하면 배포 DB도 시작하지 못함)
+        app = load_app(db_path)
+        problems = check(app, db_path, yesterday, like_counts)
+        app.tenant_registry.close_all()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    for problem in problems:
+        print('FAIL', problem)
+    print(f'첫 배포 스키마 → 마이그레이션 {len(app.MIGRATIONS)}단계: ' + ('문제 없음' if not problems else f'문제 {len(problems)}개'))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
 // ── Helpers ──
+// 학교 경로(/s/<학교>) 아래에서 열린 페이지면 서버가 넣어준 경로, 아니면 ''
+const ROOT = document.querySelector('meta[name="app-root"]')?.content || '';
+
 async function api(url, options = {}) {
-    const res = await fetch(url, {
+    const res = await fetch(ROOT + url, {
         headers: { 'Content-Type': 'application/json' },
         ...options,
     });
@@ -36,6 +39,7 @@ document.addEventListener('DOMContentLoaded', async () => {
     setupAdminLogin();
     setupAdminLogout();
     setupDatePicker();
+    setupSearch();
 });
 
 // ── Login ──
@@ -162,15 +166,18 @@ async function loadAdminQuestions() {
 
         html += data.questions.map(q => `
             <div class="flex items-center gap-3 px-3 py-3 rounded-xl border-b border-[#F5EDE5] last:border-b-0 hover:bg-cream transition ${q.is_deleted ? 'opacity-50 line-through' : ''}" id="admin-q-${q.id}">
-                <input type="checkbox" class="question-checkbox w-4 h-4 cursor-pointer flex-shrink-0" value="${q.id}" onchange="updateSelectedCount()">
+                ${q.archived
+                    ? '<span class="w-4 flex-shrink-0"></span>'
+                    : `<input type="checkbox" class="question-checkbox w-4 h-4 cursor-pointer flex-shrink-0" value="${q.id}" onchange="updateSelectedCount()">`}
                 <div class="flex-1 min-w-0">
                     <div class="text-sm">${escapeHtml(q.content)}</div>
                     <div class="text-xs text-txt-light mt-0.5">
                         ${escapeHtml(q.author)} &middot; <span class="text-pastel-coral">\u2665</span> ${q.like_count}
                         ${q.is_deleted ? ' &middot; <span class="text-pastel-coral font-bold">삭제됨</span>' : ''}
+                        ${q.archived ? ' &middot; <span class="text-txt-lighter font-bold">보관됨</span>' : ''}
                     </div>
                 </div>
-                ${q.is_deleted
+                ${q.archived ? '' : q.is_deleted
                     ? `<button class="bg-pastel-green text-txt border-none px-2.5 py-1.5 rounded-lg text-xs font-bold font-body cursor-pointer whitespace-nowrap" onclick="restoreQuestion(${q.id})">복원</button>`
                     : `<button class="bg-pastel-coral text-white border-none px-2.5 py-1.5 rounded-lg text-xs font-bold font-body cursor-pointer whitespace-nowrap" onclick="deleteQuestion(${q.id})">삭제</button>`
                 }
@@ -264,6 +271,55 @@ async function restoreQuestion(id) {
     }
 }
 
+// ── Question Search ──
+let searchQuery = '';
+let searchPage = 1;
+
+function setupSearch() {
+    document.getElementById('search-form').addEventListener('submit', (e) => {
+        e.preventDefault();
+        searchQuery = document.getElementById('search-input').value.trim();
+        if (!searchQuery) {
+            showToast('검색어를 입력해주세요', 'error');
+            return;
+        }
+        searchPage = 1;
+        document.getElementById('search-results').innerHTML = '';
+        searchQuestions();
+    });
+}
+
+async function searchQuestions() {
+    try {
+        const data = await api(`/api/admin/search?q=${encodeURIComponent(searchQuery)}&page=${searchPage}`);
+        const container = document.getElementById('search-results');
+        const moreBtn = document.getElementById('search-more');
+        if (moreBtn) moreBtn.remove();
+
+        if (searchPage === 1 && data.results.length === 0) {
+            container.innerHTML = '<p class="text-txt-lighter text-center py-5 text-sm">검색 결과가 없어요</p>';
+            return;
+        }
+
+        container.insertAdjacentHTML('beforeend', data.results.map(q => `
+            <div class="px-3 py-3 rounded-xl border-b border-[#F5EDE5] last:border-b-0 hover:bg-cream transition">
+                <div class="text-sm">${escapeHtml(q.content)}</div>
+                <div class="text-xs text-txt-light mt-0.5">
+                    ${q.created_date} &middot; ${escapeHtml(q.author)} &middot; <span class="text-pastel-coral">\u2665</span> ${q.like_count}
+                </div>
+            </div>
+        `).join(''));
+
+        if (data.has_more) {
+            container.insertAdjacentHTML('beforeend', `
+                <button id="search-more" class="w-full mt-2 py-2 rounded-xl text-sm font-bold font-body border border-[#E8ECF4] bg-white hover:bg-cream transition" onclick="searchPage++; searchQuestions();">더 보기</button>
+            `);
+        }
+    } catch (err) {
+        showToast(err.message, 'error');
+    }
+}
+
 // ── Hall of Fame Reset ──
 async function resetHallOfFame() {
     if (!confirm('명예의 전당 순위를 초기화할까요?\n오늘부터 새로 집계가 시작됩니다.\n(기존 질문과 좋아요는 유지됩니다.)')) return;
@@ -424,6 +480,53 @@ async function generatePins(target) {
     }
 }
 
+// ── Roster Import ──
+let generatedPins = [];
+
+async function importRoster() {
+    const file = document.getElementById('import-file').files[0];
+    if (!file) {
+        showToast('CSV 파일을 선택해주세요', 'error');
+        return;
+    }
+    const generatePins = document.getElementById('import-generate-pins').checked;
+    const resultEl = document.getElementById('import-result');
+    resultEl.textContent = '가져오는 중...';
+
+    try {
+        // 파일을 본문 그대로 보내 서버가 줄 단위로 읽게 함
+        const data = await api(`/api/admin/import/students?generate_pins=${generatePins ? 1 : 0}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'text/csv' },
+            body: file,
+        });
+        const errors = data.errors.map(e => `<li>${e.line}번째 줄: ${escapeHtml(e.error)}</li>`).join('');
+        resultEl.innerHTML = `<p class="font-bold">${escapeHtml(data.message)}</p>`
+            + (data.students.length ? `<button class="bg-pastel-green text-txt border-none px-3 py-1.5 mt-1.5 rounded-lg text-xs font-bold font-body cursor-pointer" onclick="downloadGeneratedPins()">생성된 비밀번호 내려받기 (${data.students.length}명)</button>` : '')
+            + (errors ? `<ul class="text-txt-light mt-1.5 list-disc pl-5">${errors}</ul>` : '');
+        generatedPins = data.students;
+        showToast(data.message);
+        loadStudents();
+    } catch (err) {
+        resultEl.textContent = '';
+        showToast(err.message, 'error');
+    }
+}
+
+// 가져오기에서 새로 만든 비밀번호를 명단과 같은 열의 CSV로 저장 (다시 가져오기에도 쓸 수 있음)
+function downloadGeneratedPins() {
+    const quote = (v) => `"${String(v).replace(/"/g, '""')}"`;
+    const lines = [['학년', '반', '번호', '이름', '비밀번호'].join(',')].concat(
+        generatedPins.map(s => [s.grade, s.class_num, s.student_num, quote(s.name), s.pin].join(','))
+    );
+    const url = URL.createObjectURL(new Blob(['\ufeff' + lines.join('\r\n') + '\r\n'], { type: 'text/csv' }));
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = '생성된_비밀번호.csv';
+    a.click();
+    URL.revokeObjectURL(url);
+}
+
 // ── Topic Management ──
 async function loadTopic() {
     try {
@@ -466,7 +569,18 @@ function downloadExcel(type) {
         return;
     }
 
-    const url = `/api/admin/export/${type}?start=${startDate}&end=${endDate}`;
-    window.location.href = url;
+    const format = document.getElementById('export-format').value;
+    const url = `/api/admin/export/${type}?start=${startDate}&end=${endDate}&format=${format}`;
+    window.location.href = ROOT + url;
     showToast('다운로드를 시작합니다!');
 }
+
+// 지난달 1일 ~ 말일 (끝난 달은 서버가 만들어 둔 파일로 바로 응답)
+function setExportLastMonth() {
+    const now = new Date();
+    const pad = n => String(n).padStart(2, '0');
+    const first = new Date(now.getFullYear(), now.getMonth() - 1, 1);
+    const last = new Date(now.getFullYear(), now.getMonth(), 0);
+    document.getElementById('export-start').value = `${first.getFullYear()}-${pad(first.getMonth() + 1)}-01`;
+    document.getElementById('export-end').value = `${last.getFullYear()}-${pad(last.getMonth() + 1)}-${pad(last.getDate())}`;
+}
@@ -1,8 +1,18 @@
 // ── State ──
 let currentDate = getLocalToday();
 let currentSort = 'latest';
+let feedUrl = null;   // 마지막으로 그린 피드 URL
+let feedEtag = null;  // 그 응답의 ETag (변경 없으면 서버가 304로 응답)
+let feedQuestions = [];     // 지금 그려진 질문 목록 (변경분을 여기에 합쳐 다시 그림)
+let feedCursor = null;      // 이 목록에 반영된 마지막 변경 번호 (/api/questions/changes의 since)
+let renderedIds = new Set(); // 이미 그린 카드 (새 카드만 등장 애니메이션)
 
 // ── Helpers ──
+// 학교 경로(/s/<학교>) 아래에서 열린 페이지면 서버가 넣어준 경로, 아니면 ''
+const ROOT = document.querySelector('meta[name="app-root"]')?.content || '';
+// 서버가 실시간 업데이트를 켠 경우에만 페이지에 들어 있음 (꺼져 있으면 30초 폴링만)
+const STREAM_ENABLED = document.querySelector('meta[name="app-stream"]')?.content === '1';
+
 function getLocalToday() {
     const d = new Date();
     return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, '0')}-${String(d.getDate()).padStart(2, '0')}`;
@@ -13,7 +23,7 @@ function toLocalDateString(d) {
 }
 
 async function api(url, options = {}) {
-    const res = await fetch(url, {
+    const res = await fetch(ROOT + url, {
         headers: { 'Content-Type': 'application/json' },
         ...options,
     });
@@ -79,17 +89,17 @@ document.addEventListener('DOMContentLoaded', async () => {
     setupHomeButton();
     updateDateDisplay();
 
-    // 30초마다 자동 새로고침 (로그인 상태일 때만)
+    // 30초마다 자동 새로고침 (로그인 상태이고 실시간 연결이 없을 때만)
     setInterval(() => {
-        if (document.getElementById('main-screen').style.display !== 'none') {
-            loadQuestions();
+        if (document.getElementById('main-screen').style.display !== 'none' && !streamConnected) {
+            refreshQuestions();
         }
     }, 30000);
 
     // 탭으로 돌아올 때 즉시 새로고침
     document.addEventListener('visibilitychange', () => {
         if (!document.hidden && document.getElementById('main-screen').style.display !== 'none') {
-            loadQuestions();
+            refreshQuestions();
             loadTopic();
         }
     });
@@ -127,7 +137,7 @@ function setupLoginForm() {
             const body = { grade, class_num, student_num, name };
             if (pin) body.pin = pin;
 
-            const res = await fetch('/api/login', {
+            const res = await fetch(ROOT + '/api/login', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify(body),
@@ -198,6 +208,62 @@ function showMainScreen(student) {
     updateDateDisplay();
     loadQuestions();
     loadTopic();
+    startLiveUpdates();
+}
+
+// ── Live Updates ──
+// 서버가 보내는 변경 이벤트를 받아 목록을 부분 갱신. 꺼져 있거나 연결이 끊긴 동안은 30초 폴링이 대신함
+let eventSource = null;
+let streamConnected = false;
+
+function startLiveUpdates() {
+    if (!STREAM_ENABLED || !window.EventSource || eventSource) return;
+    eventSource = new EventSource(ROOT + '/api/stream');
+    eventSource.onopen = () => { streamConnected = true; };
+    eventSource.onerror = () => { streamConnected = false; };
+
+    eventSource.addEventListener('question', (e) => {
+        const ev = JSON.parse(e.data);
+        if (ev.date !== currentDate) return;
+        const card = document.getElementById(`question-card-${ev.id}`);
+
+        if (ev.action === 'updated' && card) {
+            const contentEl = card.querySelector(`.question-content-${ev.id}`);
+            patchQuestion(ev.id, { content: ev.content });
+            // 수정 중인 카드는 건드리지 않음
+            if (contentEl && !contentEl.querySelector('textarea')) contentEl.textContent = ev.content;
+        } else if (ev.action === 'deleted' && card) {
+            feedQuestions = feedQuestions.filter(q => q.id !== ev.id);
+            renderedIds.delete(ev.id);
+            card.remove();
+            const remaining = document.querySelectorAll('#questions-list > div').length;
+            document.getElementById('question-count').textContent = `${remaining}개`;
+            if (remaining === 0) document.getElementById('empty-state').style.display = 'block';
+        } else if (ev.action === 'created' || ev.action === 'restored') {
+            refreshQuestions();
+        }
+    });
+
+    eventSource.addEventListener('like', (e) => {
+        const ev = JSON.parse(e.data);
+        const card = document.getElementById(`question-card-${ev.id}`);
+        patchQuestion(ev.id, { like_count: ev.like_count });
+        if (card) card.querySelector('.like-count').textContent = ev.like_count;
+    });
+
+    eventSource.addEventListener('topic', (e) => {
+        const ev = JSON.parse(e.data);
+        document.getElementById('topic-name').textContent = ev.topic;
+        document.getElementById('topic-banner').style.display = 'block';
+    });
+}
+
+function stopLiveUpdates() {
+    if (eventSource) {
+        eventSource.close();
+        eventSource = null;
+    }
+    streamConnected = false;
 }
 
 // ── Topic ──
@@ -217,6 +283,7 @@ async function loadTopic() {
 function setupLogout() {
     document.getElementById('logout-btn').addEventListener('click', async () => {
         await api('/api/logout', { method: 'POST' });
+        stopLiveUpdates();
         document.getElementById('main-screen').style.display = 'none';
         document.getElementById('login-screen').style.display = 'block';
         document.getElementById('login-form').reset();
@@ -274,7 +341,16 @@ function setupQuestionForm() {
 // ── Load Questions ──
 async function loadQuestions() {
     try {
-        const data = await api(`/api/questions?date=${currentDate}&sort=${currentSort}`);
+        const url = `/api/questions?date=${currentDate}&sort=${currentSort}`;
+        const headers = {};
+        if (feedEtag && feedUrl === url) headers['If-None-Match'] = feedEtag;
+
+        const res = await fetch(ROOT + url, { headers, cache: 'no-store' });
+        if (res.status === 304) return;  // 바뀐 게 없으면 다시 그리지 않음
+        const data = await res.json();
+        if (!res.ok) throw new Error(data.error || '오류가 발생했습니다');
+        feedUrl = url;
+        feedEtag = res.headers.get('ETag');
 
         const formContainer = document.getElementById('question-form-container');
         const alreadyPosted = document.getElementById('already-posted');
@@ -291,54 +367,107 @@ async function loadQuestions() {
             alreadyPosted.style.display = 'none';
         }
 
-        const list = document.getElementById('questions-list');
-        const empty = document.getElementById('empty-state');
-        const countBadge = document.getElementById('question-count');
+        feedQuestions = data.questions;
+        feedCursor = data.changes_cursor;
+        renderQuestions(data.total_count);
+    } catch (err) {
+        showToast(err.message, 'error');
+    }
+}
 
-        countBadge.textContent = `${data.total_count}개`;
+// 마지막으로 받은 뒤 바뀐 질문만 받아 목록에 합침 (다른 날짜/정렬이거나 받은 적 없으면 전체 조회)
+async function refreshQuestions() {
+    const url = `/api/questions?date=${currentDate}&sort=${currentSort}`;
+    if (feedCursor === null || feedUrl !== url) return loadQuestions();
 
-        if (data.questions.length === 0) {
-            list.innerHTML = '';
-            empty.style.display = 'block';
-            return;
+    try {
+        const data = await api(`/api/questions/changes?date=${currentDate}&since=${feedCursor}`);
+        if (feedUrl !== url) return;  // 기다리는 사이 날짜/정렬이 바뀜
+        if (data.reset) {
+            feedEtag = null;
+            return loadQuestions();
         }
+        feedCursor = data.changes_cursor;
+        if (data.questions.length === 0 && data.deleted.length === 0) return;
+
+        const changed = new Map(data.questions.map(q => [q.id, q]));
+        const removed = new Set(data.deleted);
+        feedQuestions = feedQuestions
+            .filter(q => !removed.has(q.id) && !changed.has(q.id))
+            .concat(data.questions);
+        sortQuestions(feedQuestions);
+        renderQuestions(data.total_count);
+    } catch (err) {
+        showToast(err.message, 'error');
+    }
+}
 
-        empty.style.display = 'none';
-        list.innerHTML = data.questions.map((q, i) => `
-            <div class="bg-white rounded-2xl shadow-md p-4 transition-all hover:shadow-lg border border-[#FFE8CC]/30 animate-slideUp ${q.is_mine ? 'border-l-4 border-l-pastel-orange bg-cream' : ''}" style="animation-delay: ${i * 0.05}s" id="question-card-${q.id}">
-                <div class="flex items-center justify-between mb-2.5">
-                    <div class="flex items-center gap-2">
-                        <div class="w-8 h-8 rounded-full flex items-center justify-center text-sm font-bold text-white grade-${q.grade}">
-                            ${q.grade}
-                        </div>
-                        <div class="flex flex-col">
-                            <span class="text-sm font-bold">${escapeHtml(q.author)}</span>
-                            <span class="text-xs text-txt-lighter">${formatTime(q.created_at)}</span>
-                        </div>
+// 서버의 정렬과 같은 순서 (최신순: 작성 시각, 좋아요순: 좋아요 수 → 작성 시각, 동점은 id)
+function sortQuestions(questions) {
+    const byLatest = (a, b) => (a.created_at < b.created_at ? 1 : a.created_at > b.created_at ? -1 : b.id - a.id);
+    questions.sort(currentSort === 'likes'
+        ? (a, b) => (b.like_count - a.like_count) || byLatest(a, b)
+        : byLatest);
+}
+
+function patchQuestion(questionId, fields) {
+    const q = feedQuestions.find(q => q.id === questionId);
+    if (q) Object.assign(q, fields);
+}
+
+function renderQuestions(totalCount) {
+    const list = document.getElementById('questions-list');
+    const empty = document.getElementById('empty-state');
+    const countBadge = document.getElementById('question-count');
+
+    countBadge.textContent = `${totalCount}개`;
+
+    if (feedQuestions.length === 0) {
+        list.innerHTML = '';
+        empty.style.display = 'block';
+        renderedIds = new Set();
+        return;
+    }
+
+    empty.style.display = 'none';
+    let delay = 0;
+    list.innerHTML = feedQuestions.map(q => `
+        <div class="bg-white rounded-2xl shadow-md p-4 transition-all hover:shadow-lg border border-[#FFE8CC]/30 ${renderedIds.has(q.id) ? '' : 'animate-slideUp'} ${q.is_mine ? 'border-l-4 border-l-pastel-orange bg-cream' : ''}" style="animation-delay: ${renderedIds.has(q.id) ? 0 : (delay++) * 0.05}s" id="question-card-${q.id}">
+            <div class="flex items-center justify-between mb-2.5">
+                <div class="flex items-center gap-2">
+                    <div class="w-8 h-8 rounded-full flex items-center justify-center text-sm font-bold text-white grade-${q.grade}">
+                        ${q.grade}
+                    </div>
+                    <div class="flex flex-col">
+                        <span class="text-sm font-bold">${escapeHtml(q.author)}</span>
+                        <span class="text-xs text-txt-lighter">${formatTime(q.created_at)}</span>
                     </div>
-                    ${q.is_mine ? `
-                    <div class="flex items-center gap-1">
-                        <button class="px-2.5 py-1 rounded-lg text-xs font-bold border border-[#FFD0A0] text-txt-light bg-white hover:border-pastel-orange hover:text-pastel-orange transition" onclick="startEditQuestion(${q.id}, this)">수정</button>
-                        <button class="px-2.5 py-1 rounded-lg text-xs font-bold border border-pastel-coral/40 text-pastel-coral bg-white hover:bg-red-50 transition" onclick="deleteMyQuestion(${q.id})">삭제</button>
-                    </div>` : ''}
-                </div>
-                <div class="question-content-${q.id} text-base leading-relaxed mb-3 break-words">${escapeHtml(q.content)}</div>
-                <div class="flex items-center gap-3">
-                    <button class="like-btn inline-flex items-center gap-1.5 px-4 py-1.5 border-2 rounded-full text-sm font-semibold cursor-pointer transition-all
-                        ${q.liked_by_me
-                            ? 'border-pastel-coral text-pastel-coral bg-red-50'
-                            : 'border-[#FFD0A0] text-txt-light bg-white hover:border-pastel-coral hover:text-pastel-coral hover:bg-red-50'}"
-                        onclick="toggleLike(${q.id}, this)">
-                        <span class="heart text-base transition-transform ${q.liked_by_me ? 'text-pastel-coral' : 'text-txt-lighter'}">\u2665</span>
-                        <span class="like-count">${q.like_count}</span>
-                    </button>
                 </div>
+                ${q.is_mine && !q.archived ? `
+                <div class="flex items-center gap-1">
+                    <button class="px-2.5 py-1 rounded-lg text-xs font-bold border border-[#FFD0A0] text-txt-light bg-white hover:border-pastel-orange hover:text-pastel-orange transition" onclick="startEditQuestion(${q.id}, this)">수정</button>
+                    <button class="px-2.5 py-1 rounded-lg text-xs font-bold border border-pastel-coral/40 text-pastel-coral bg-white hover:bg-red-50 transition" onclick="deleteMyQuestion(${q.id})">삭제</button>
+                </div>` : ''}
             </div>
-        `).join('');
-
-    } catch (err) {
-        showToast(err.message, 'error');
-    }
+            <div class="question-content-${q.id} text-base leading-relaxed mb-3 break-words">${escapeHtml(q.content)}</div>
+            <div class="flex items-center gap-3">
+                ${q.archived ? `
+                <span class="inline-flex items-center gap-1.5 px-4 py-1.5 border-2 rounded-full text-sm font-semibold border-[#FFE8CC] text-txt-lighter bg-white" title="지난 학기 질문은 좋아요를 누를 수 없어요">
+                    <span class="heart text-base ${q.liked_by_me ? 'text-pastel-coral' : 'text-txt-lighter'}">\u2665</span>
+                    <span class="like-count">${q.like_count}</span>
+                </span>` : `
+                <button class="like-btn inline-flex items-center gap-1.5 px-4 py-1.5 border-2 rounded-full text-sm font-semibold cursor-pointer transition-all
+                    ${q.liked_by_me
+                        ? 'border-pastel-coral text-pastel-coral bg-red-50'
+                        : 'border-[#FFD0A0] text-txt-light bg-white hover:border-pastel-coral hover:text-pastel-coral hover:bg-red-50'}"
+                    onclick="toggleLike(${q.id}, this)">
+                    <span class="heart text-base transition-transform ${q.liked_by_me ? 'text-pastel-coral' : 'text-txt-lighter'}">\u2665</span>
+                    <span class="like-count">${q.like_count}</span>
+                </button>`}
+            </div>
+        </div>
+    `).join('');
+    renderedIds = new Set(feedQuestions.map(q => q.id));
 }
 
 function escapeHtml(str) {
@@ -364,6 +493,7 @@ async function toggleLike(questionId, btn) {
             heart.className = 'heart text-base transition-transform text-txt-lighter';
         }
         count.textContent = data.like_count;
+        patchQuestion(questionId, { liked_by_me: data.liked, like_count: data.like_count });
     } catch (err) {
         showToast(err.message, 'error');
     }
@@ -499,7 +629,7 @@ async function saveEditQuestion(questionId) {
             body: JSON.stringify({ content }),
         });
         showToast(data.message);
-        loadQuestions();
+        refreshQuestions();
     } catch (err) {
         showToast(err.message, 'error');
     }
@@ -1,3 +1,9 @@
 # PythonAnywhere WSGI 설정 파일
 # 이 파일은 PythonAnywhere에서 앱을 실행할 때 사용됩니다.
+#
+# 실시간 업데이트(/api/stream, Server-Sent Events)는 기본으로 꺼져 있습니다.
+# 연결 하나가 워커 하나를 최대 STREAM_MAX_SECONDS초(기본 300초) 붙잡기 때문에, 동기 워커 몇 개로
+# 도는 PythonAnywhere 같은 환경에서 켜면 탭 몇 개만 열려도 다른 요청이 기다리게 됩니다.
+# 동시 연결 수만큼 스레드/비동기 워커를 둘 수 있는 서버에서만 STREAM_ENABLED=1로 켜세요.
+# 꺼져 있으면 브라우저는 30초마다 폴링합니다.
 from app import app as application